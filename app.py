@@ -1,24 +1,19 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import json
-import requests
 from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-import base64
 import io
-import re
-from typing import Dict, List, Tuple, Optional
+from typing import TYPE_CHECKING, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+from medverify import (MedicalPrescriptionVerifier, cached_pdf_report, extract_medications_from_text,
+                       stream_medications)
+
+# Charts, tables and reports import plotly.express, pandas and ReportLab where they are built, so
+# the app adds nothing heavy to startup (Streamlit itself already loads pandas and plotly.graph_objects);
+# `python -m medverify.importtime app.py` reports startup imports
+if TYPE_CHECKING:
+    import pandas as pd
+
 # Page configuration
 st.set_page_config(
     page_title="AI Medical Prescription Verification",
@@ -141,581 +136,157 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource
+def load_verifier() -> MedicalPrescriptionVerifier:
+    """One verifier per server process; its knowledge base is read-only and shared by all sessions"""
+    return MedicalPrescriptionVerifier()
 
 
+@st.cache_data(show_spinner=False)
+def database_statistics(checksum: str, _knowledge_base) -> dict:
+    """Drug, category and interaction counts, computed once per drug-data checksum"""
+    catalog = _knowledge_base.drug_catalog()
+    return {
+        'drugs': len(catalog),
+        'categories': len(catalog.categories),
+        'interactions': len(_knowledge_base.interaction_database),
+        'age_groups': len(_knowledge_base.dosage_guidelines),
+        'category_counts': {category: len(ids) for category, ids in catalog.category_ids.items()},
+    }
 
-class MedicalPrescriptionVerifier:
-    def __init__(self):
-        self.drug_database = self._initialize_drug_database()
-        self.interaction_database = self._initialize_interaction_database()
-        self.dosage_guidelines = self._initialize_dosage_guidelines()
-        
-    def _initialize_drug_database(self):
-        """Initialize comprehensive drug database"""
-        return {
-            'paracetamol': {
-                'generic_name': 'Acetaminophen',
-                'category': 'Analgesic/Antipyretic',
-                'adult_dosage': '500-1000mg every 4-6 hours',
-                'max_daily': '4000mg',
-                'pediatric_dosage': '10-15mg/kg every 4-6 hours',
-                'contraindications': ['liver disease', 'alcohol dependency'],
-                'side_effects': ['nausea', 'skin rash', 'liver toxicity'],
-                'alternatives': ['ibuprofen', 'aspirin', 'diclofenac'],
-                'interactions': ['warfarin', 'alcohol']
-            },
-            'acetaminophen': {
-                'generic_name': 'Acetaminophen',
-                'category': 'Analgesic/Antipyretic',
-                'adult_dosage': '500-1000mg every 4-6 hours',
-                'max_daily': '4000mg',
-                'pediatric_dosage': '10-15mg/kg every 4-6 hours',
-                'contraindications': ['liver disease', 'alcohol dependency'],
-                'side_effects': ['nausea', 'skin rash', 'liver toxicity'],
-                'alternatives': ['ibuprofen', 'aspirin', 'diclofenac'],
-                'interactions': ['warfarin', 'alcohol']
-            },
-            'ibuprofen': {
-                'generic_name': 'Ibuprofen',
-                'category': 'NSAID',
-                'adult_dosage': '200-400mg every 4-6 hours',
-                'max_daily': '1200mg',
-                'pediatric_dosage': '5-10mg/kg every 6-8 hours',
-                'contraindications': ['kidney disease', 'heart disease', 'stomach ulcers'],
-                'side_effects': ['stomach upset', 'dizziness', 'kidney problems'],
-                'alternatives': ['paracetamol', 'naproxen', 'aspirin'],
-                'interactions': ['warfarin', 'ace inhibitors']
-            },
-            'amoxicillin': {
-                'generic_name': 'Amoxicillin',
-                'category': 'Antibiotic',
-                'adult_dosage': '250-500mg every 8 hours',
-                'max_daily': '1500mg',
-                'pediatric_dosage': '25-45mg/kg/day divided every 12 hours',
-                'contraindications': ['penicillin allergy'],
-                'side_effects': ['diarrhea', 'nausea', 'allergic reaction'],
-                'alternatives': ['azithromycin', 'cephalexin', 'doxycycline'],
-                'interactions': ['methotrexate', 'oral contraceptives']
-            },
-            'metformin': {
-                'generic_name': 'Metformin',
-                'category': 'Antidiabetic',
-                'adult_dosage': '500mg twice daily',
-                'max_daily': '2000mg',
-                'pediatric_dosage': 'Not recommended under 10 years',
-                'contraindications': ['kidney disease', 'liver disease'],
-                'side_effects': ['nausea', 'diarrhea', 'metallic taste'],
-                'alternatives': ['glipizide', 'insulin', 'gliclazide'],
-                'interactions': ['alcohol', 'contrast dyes']
-            },
-            'atorvastatin': {
-                'generic_name': 'Atorvastatin',
-                'category': 'Statin',
-                'adult_dosage': '10-20mg once daily',
-                'max_daily': '80mg',
-                'pediatric_dosage': 'Not recommended under 10 years',
-                'contraindications': ['liver disease', 'pregnancy'],
-                'side_effects': ['muscle pain', 'liver problems'],
-                'alternatives': ['rosuvastatin', 'simvastatin', 'pravastatin'],
-                'interactions': ['warfarin', 'digoxin']
-            },
-            'aspirin': {
-                'generic_name': 'Acetylsalicylic Acid',
-                'category': 'NSAID/Antiplatelet',
-                'adult_dosage': '325-650mg every 4 hours',
-                'max_daily': '3900mg',
-                'pediatric_dosage': 'Not recommended under 16 years (Reye syndrome risk)',
-                'contraindications': ['bleeding disorders', 'stomach ulcers', 'asthma'],
-                'side_effects': ['stomach bleeding', 'tinnitus', 'allergic reactions'],
-                'alternatives': ['paracetamol', 'ibuprofen', 'naproxen'],
-                'interactions': ['warfarin', 'alcohol', 'methotrexate']
-            },
-            'lisinopril': {
-                'generic_name': 'Lisinopril',
-                'category': 'ACE Inhibitor',
-                'adult_dosage': '5-10mg once daily',
-                'max_daily': '40mg',
-                'pediatric_dosage': 'Weight-based dosing required',
-                'contraindications': ['pregnancy', 'bilateral renal artery stenosis'],
-                'side_effects': ['dry cough', 'dizziness', 'hyperkalemia'],
-                'alternatives': ['losartan', 'amlodipine', 'enalapril'],
-                'interactions': ['potassium supplements', 'lithium']
-            }
-        }
-    
-    def _initialize_interaction_database(self):
-        """Initialize drug interaction database"""
-        return {
-            ('warfarin', 'paracetamol'): {'severity': 'moderate', 'description': 'Increased bleeding risk with high doses'},
-            ('warfarin', 'acetaminophen'): {'severity': 'moderate', 'description': 'Increased bleeding risk with high doses'},
-            ('warfarin', 'ibuprofen'): {'severity': 'high', 'description': 'Significantly increased bleeding risk'},
-            ('warfarin', 'aspirin'): {'severity': 'high', 'description': 'Major bleeding risk - avoid combination'},
-            ('metformin', 'alcohol'): {'severity': 'high', 'description': 'Risk of lactic acidosis'},
-            ('ibuprofen', 'lisinopril'): {'severity': 'moderate', 'description': 'Reduced kidney function'},
-            ('aspirin', 'ibuprofen'): {'severity': 'moderate', 'description': 'Increased GI bleeding risk'},
-            ('atorvastatin', 'amoxicillin'): {'severity': 'low', 'description': 'Minor interaction - monitor'},
-        }
-    
-    def _initialize_dosage_guidelines(self):
-        """Initialize age-based dosage guidelines"""
-        return {
-            'pediatric': {'min_age': 0, 'max_age': 12, 'weight_factor': 0.5},
-            'adolescent': {'min_age': 13, 'max_age': 17, 'weight_factor': 0.75},
-            'adult': {'min_age': 18, 'max_age': 64, 'weight_factor': 1.0},
-            'elderly': {'min_age': 65, 'max_age': 120, 'weight_factor': 0.8}
-        }
-    
-    def analyze_prescription(self, patient_data: Dict, medications: List[Dict]) -> Dict:
-        """Main analysis function"""
-        results = {
-            'patient_info': patient_data,
-            'medications': [],
-            'interactions': [],
-            'safety_score': 0,
-            'recommendations': [],
-            'home_remedies': []
-        }
-        
-        # Analyze each medication
-        for med in medications:
-            med_analysis = self._analyze_medication(patient_data, med)
-            results['medications'].append(med_analysis)
-        
-        # Check interactions
-        results['interactions'] = self._check_interactions(medications)
-        
-        # Calculate safety score
-        results['safety_score'] = self._calculate_safety_score(results)
-        
-        # Generate recommendations
-        results['recommendations'] = self._generate_recommendations(results)
-        
-        # Add home remedies
-        results['home_remedies'] = self._generate_home_remedies(medications)
-        
-        return results
-    
-    def _analyze_medication(self, patient_data: Dict, medication: Dict) -> Dict:
-        """Analyze individual medication"""
-        drug_name = medication['name'].lower().strip()
-        dosage = medication.get('dosage', '')
-        frequency = medication.get('frequency', '')
-        
-        if drug_name in self.drug_database:
-            drug_info = self.drug_database[drug_name]
-            age_group = self._get_age_group(patient_data['age'])
-            
-            analysis = {
-                'name': medication['name'].title(),
-                'dosage': dosage,
-                'frequency': frequency,
-                'drug_info': drug_info,
-                'age_appropriate': self._check_age_appropriateness(drug_info, patient_data['age']),
-                'dosage_appropriate': self._check_dosage_appropriateness(drug_info, dosage, patient_data),
-                'alternatives': drug_info.get('alternatives', []),
-                'warnings': [],
-                'found_in_database': True
-            }
-            
-            # Check contraindications
-            if 'contraindications' in drug_info:
-                analysis['warnings'].extend(drug_info['contraindications'])
-            
-            return analysis
-        else:
-            return {
-                'name': medication['name'].title(),
-                'dosage': dosage,
-                'frequency': frequency,
-                'drug_info': None,
-                'age_appropriate': True,
-                'dosage_appropriate': True,
-                'alternatives': ['Consult healthcare provider for alternatives'],
-                'warnings': ['Drug not found in database - manual verification required'],
-                'found_in_database': False
-            }
-    
-    def _get_age_group(self, age: int) -> str:
-        """Determine age group"""
-        for group, criteria in self.dosage_guidelines.items():
-            if criteria['min_age'] <= age <= criteria['max_age']:
-                return group
-        return 'adult'
-    
-    def _check_age_appropriateness(self, drug_info: Dict, age: int) -> bool:
-        """Check if drug is appropriate for age"""
-        pediatric_dosage = drug_info.get('pediatric_dosage', '')
-        if age < 16 and 'Not recommended under 16 years' in pediatric_dosage:
-            return False
-        if age < 10 and 'Not recommended under 10 years' in pediatric_dosage:
-            return False
-        return True
-    
-    def _check_dosage_appropriateness(self, drug_info: Dict, dosage: str, patient_data: Dict) -> bool:
-        """Check if dosage is appropriate - simplified implementation"""
-        # In a real system, this would parse dosage and compare with guidelines
-        return True
-    
-    def _check_interactions(self, medications: List[Dict]) -> List[Dict]:
-        """Check for drug interactions"""
-        interactions = []
-        
-        for i, med1 in enumerate(medications):
-            for j, med2 in enumerate(medications[i+1:], i+1):
-                drug1 = med1['name'].lower().strip()
-                drug2 = med2['name'].lower().strip()
-                
-                interaction_key = tuple(sorted([drug1, drug2]))
-                if interaction_key in self.interaction_database:
-                    interaction_info = self.interaction_database[interaction_key]
-                    interactions.append({
-                        'drug1': med1['name'].title(),
-                        'drug2': med2['name'].title(),
-                        'severity': interaction_info['severity'],
-                        'description': interaction_info['description']
-                    })
-        
-        return interactions
-    
-    def _calculate_safety_score(self, results: Dict) -> int:
-        """Calculate overall safety score (0-100)"""
-        base_score = 100
-        
-        # Deduct points for interactions
-        for interaction in results['interactions']:
-            if interaction['severity'] == 'high':
-                base_score -= 30
-            elif interaction['severity'] == 'moderate':
-                base_score -= 15
-            else:
-                base_score -= 5
-        
-        # Deduct points for warnings and appropriateness
-        for med in results['medications']:
-            base_score -= len(med['warnings']) * 5
-            if not med['age_appropriate']:
-                base_score -= 20
-            if not med['dosage_appropriate']:
-                base_score -= 10
-            if not med['found_in_database']:
-                base_score -= 15
-        
-        return max(0, base_score)
-    
-    def _generate_recommendations(self, results: Dict) -> List[str]:
-        """Generate safety recommendations"""
-        recommendations = []
-        
-        if results['safety_score'] < 70:
-            recommendations.append("⚠️ URGENT: Consult with healthcare provider before taking these medications")
-        
-        for interaction in results['interactions']:
-            if interaction['severity'] == 'high':
-                recommendations.append(f"🚨 HIGH RISK: Avoid combining {interaction['drug1']} with {interaction['drug2']}")
-            elif interaction['severity'] == 'moderate':
-                recommendations.append(f"⚠️ MODERATE RISK: Monitor closely when taking {interaction['drug1']} with {interaction['drug2']}")
-        
-        for med in results['medications']:
-            if not med['age_appropriate']:
-                recommendations.append(f"❌ AGE CONCERN: {med['name']} may not be appropriate for this age group")
-            if med['warnings']:
-                recommendations.append(f"⚠️ {med['name']}: Check for {', '.join(med['warnings'])}")
-            if not med['found_in_database']:
-                recommendations.append(f"🔍 {med['name']}: Not in database - requires manual verification")
-        
-        if not recommendations:
-            recommendations.append("✅ No major safety concerns identified")
-        
-        # Add general recommendations
-        recommendations.append("📋 Always take medications as prescribed by your healthcare provider")
-        recommendations.append("🕒 Maintain consistent timing for medication doses")
-        recommendations.append("💧 Stay hydrated while taking medications")
-        
-        return recommendations
-    
-    def _generate_home_remedies(self, medications: List[Dict]) -> List[Dict]:
-        """Generate home remedy suggestions"""
-        remedies = [
-            {
-                'category': 'Hydration',
-                'recommendation': 'Drink 8-10 glasses of water daily',
-                'benefit': 'Helps medication absorption and reduces side effects'
-            },
-            {
-                'category': 'Nutrition',
-                'recommendation': 'Take medications with food if recommended',
-                'benefit': 'Reduces stomach irritation and improves absorption'
-            },
-            {
-                'category': 'Sleep',
-                'recommendation': 'Maintain 7-8 hours of quality sleep',
-                'benefit': 'Supports immune system and medication effectiveness'
-            },
-            {
-                'category': 'Exercise',
-                'recommendation': 'Light to moderate exercise as tolerated',
-                'benefit': 'Improves circulation and overall health'
-            },
-            {
-                'category': 'Monitoring',
-                'recommendation': 'Keep a medication diary',
-                'benefit': 'Track effectiveness and side effects'
-            },
-            {
-                'category': 'Safety',
-                'recommendation': 'Store medications properly',
-                'benefit': 'Maintains medication potency and prevents accidents'
-            }
-        ]
-        
-        return remedies
 
-def extract_medications_from_text(text: str) -> List[Dict]:
-    """Extract medication information from text using NLP patterns"""
-    medications = []
-    
-    # Simple regex patterns for medication extraction
-    patterns = [
-        r'(\w+)\s+(\d+(?:\.\d+)?)\s*(?:mg|g|ml)\s+(?:every|q)\s+(\d+)\s*(?:hours|hrs|h)',
-        r'(\w+)\s+(\d+(?:\.\d+)?)\s*(?:mg|g|ml)\s+(\d+)\s*(?:times|x)\s+(?:daily|day)',
-        r'(\w+)\s+(\d+(?:\.\d+)?)\s*(?:mg|g|ml)\s+(?:bid|tid|qid|od)',
-        r'(\w+)\s+(\d+(?:\.\d+)?)\s*(?:mg|g|ml)\s*,?\s*(?:once|twice|thrice)?\s*(?:daily|day|per day)',
-    ]
+@st.cache_data(show_spinner=False)
+def category_chart(checksum: str, _knowledge_base) -> dict:
+    """Plotly spec of the category distribution pie, built once per drug-data checksum"""
+    import plotly.express as px
     
-    for pattern in patterns:
-        matches = re.finditer(pattern, text.lower())
-        for match in matches:
-            med_name = match.group(1).capitalize()
-            dosage = f"{match.group(2)}mg"
-            
-            if len(match.groups()) > 2:
-                frequency = match.group(3) if match.group(3).isdigit() else 'as prescribed'
-                if frequency.isdigit():
-                    frequency = f"{frequency} times daily"
-            else:
-                frequency = 'as prescribed'
-                
-            medications.append({
-                'name': med_name,
-                'dosage': dosage,
-                'frequency': frequency
-            })
+    category_counts = database_statistics(checksum, _knowledge_base)['category_counts']
     
-    # If no medications found with regex, try simple word extraction
-    if not medications:
-        words = text.split()
-        for i, word in enumerate(words):
-            if any(unit in word.lower() for unit in ['mg', 'g', 'ml']):
-                if i > 0:
-                    medications.append({
-                        'name': words[i-1].capitalize(),
-                        'dosage': word,
-                        'frequency': 'as prescribed'
-                    })
-    
-    return medications
-
-def generate_pdf_report(analysis_results: Dict) -> bytes:
-    """Generate PDF report"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.darkblue,
-        alignment=TA_CENTER,
-        spaceAfter=30
+    # Create a colorful pie chart
+    fig = px.pie(
+        values=list(category_counts.values()),
+        names=list(category_counts.keys()),
+        title="Distribution of Drugs by Medical Category",
+        color_discrete_sequence=px.colors.qualitative.Set3
     )
-    story.append(Paragraph("🏥 Medical Prescription Verification Report", title_style))
-    story.append(Spacer(1, 20))
-    
-    # Patient Information
-    story.append(Paragraph("👤 Patient Information", styles['Heading2']))
-    patient_info = analysis_results['patient_info']
-    patient_data = [
-        ['Name:', patient_info['name']],
-        ['Age:', f"{patient_info['age']} years"],
-        ['Weight:', f"{patient_info['weight']} kg"],
-        ['Report Date:', datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
-    ]
-    
-    patient_table = Table(patient_data, colWidths=[2*inch, 4*inch])
-    patient_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.darkblue),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('PADDING', (0, 0), (-1, -1), 12),
-    ]))
-    
-    story.append(patient_table)
-    story.append(Spacer(1, 25))
-    
-    # Safety Score
-    story.append(Paragraph("📊 Safety Assessment", styles['Heading2']))
-    safety_score = analysis_results['safety_score']
-    
-    if safety_score >= 80:
-        score_color = colors.green
-        status = "SAFE"
-    elif safety_score >= 60:
-        score_color = colors.orange
-        status = "CAUTION REQUIRED"
-    else:
-        score_color = colors.red
-        status = "HIGH RISK"
-    
-    story.append(Paragraph(f"Overall Safety Score: <font color='{score_color}' size='14'><b>{safety_score}/100</b></font>", styles['Normal']))
-    story.append(Paragraph(f"Status: <font color='{score_color}' size='12'><b>{status}</b></font>", styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    # Medications
-    story.append(Paragraph("💊 Prescribed Medications", styles['Heading2']))
-    
-    med_data = [['Medication', 'Dosage', 'Frequency', 'Status']]
-    for med in analysis_results['medications']:
-        status = "✅ Safe" if med['age_appropriate'] and med['dosage_appropriate'] and med['found_in_database'] else "⚠️ Review Required"
-        med_data.append([
-            med['name'],
-            med['dosage'],
-            med['frequency'],
-            status
-        ])
-    
-    med_table = Table(med_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-    med_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('PADDING', (0, 0), (-1, -1), 8),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-    ]))
-    
-    story.append(med_table)
-    story.append(Spacer(1, 20))
-    
-    # Medication warnings
-    for med in analysis_results['medications']:
-        if med['warnings']:
-            story.append(Paragraph(f"⚠️ <b>{med['name']} Warnings:</b>", styles['Normal']))
-            for warning in med['warnings']:
-                story.append(Paragraph(f"  • {warning}", styles['Normal']))
-            story.append(Spacer(1, 10))
-    
-    # Drug Interactions
-    if analysis_results['interactions']:
-        story.append(Paragraph("⚠️ Drug Interactions Detected", styles['Heading2']))
-        
-        interaction_data = [['Drug 1', 'Drug 2', 'Severity', 'Description']]
-        for interaction in analysis_results['interactions']:
-            severity_color = colors.red if interaction['severity'] == 'high' else colors.orange if interaction['severity'] == 'moderate' else colors.blue
-            interaction_data.append([
-                interaction['drug1'],
-                interaction['drug2'],
-                interaction['severity'].upper(),
-                interaction['description']
-            ])
-        
-        interaction_table = Table(interaction_data, colWidths=[1.5*inch, 1.5*inch, 1*inch, 2.5*inch])
-        interaction_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.red),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('PADDING', (0, 0), (-1, -1), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ]))
-        
-        story.append(interaction_table)
-        story.append(Spacer(1, 20))
-    else:
-        story.append(Paragraph("✅ No Drug Interactions Detected", styles['Heading2']))
-        story.append(Spacer(1, 15))
-    
-    # Alternative Medications
-    story.append(Paragraph("🔄 Alternative Medications", styles['Heading2']))
-    for med in analysis_results['medications']:
-        if med['alternatives'] and med['alternatives'] != ['Consult healthcare provider for alternatives']:
-            story.append(Paragraph(f"<b>{med['name']} alternatives:</b>", styles['Normal']))
-            for alt in med['alternatives'][:3]:  # Show top 3 alternatives
-                story.append(Paragraph(f"  • {alt.title()}", styles['Normal']))
-            story.append(Spacer(1, 10))
-    
-    story.append(Spacer(1, 15))
+    fig.update_layout(
+        font=dict(color='#1e3a8a', family='Arial'),
+        title_font_size=16,
+        showlegend=True
+    )
+    return fig.to_dict()
+
+
+@st.cache_data(show_spinner=False)
+def interaction_table(checksum: str, _knowledge_base) -> "pd.DataFrame":
+    """Known interactions as a display table, built once per drug-data checksum"""
+    import pandas as pd
     
-    # Recommendations
-    story.append(Paragraph("📋 Healthcare Recommendations", styles['Heading2']))
-    for i, rec in enumerate(analysis_results['recommendations'][:8], 1):  # Limit to 8 recommendations
-        story.append(Paragraph(f"{i}. {rec}", styles['Normal']))
+    interaction_data = []
+    for (drug1, drug2), info in _knowledge_base.interaction_database.items():
+        interaction_data.append({
+            'Drug 1': drug1.title(),
+            'Drug 2': drug2.title(),
+            'Severity': info['severity'].title(),
+            'Description': info['description']
+        })
+    return pd.DataFrame(interaction_data)
+
+
+# Best-ranked search hits listed in the Drug Database; the match count covers all of them
+SEARCH_RESULT_LIMIT = 500
+
+# Edge budgets offered for the network view; WebGL traces stay responsive up to tens of thousands
+NETWORK_EDGE_BUDGETS = [500, 1000, 2000, 5000, 10000, 20000]
+NETWORK_LABEL_LIMIT = 40
+SEVERITY_COLORS = {'high': '#dc2626', 'moderate': '#f59e0b', 'low': '#10b981'}
+
+
+@st.cache_data(show_spinner=False)
+def interaction_network_chart(checksum: str, _knowledge_base, center: Optional[int], max_edges: int) -> dict:
+    """Plotly spec of the interaction network, on node positions laid out once per drug-data checksum.
     
-    story.append(Spacer(1, 20))
+    Only the ``max_edges`` most severe interactions are drawn; with a ``center`` drug, its ego
+    network is highlighted on top of them at the same positions.
+    """
+    import numpy as np
+    import plotly.graph_objects as go
     
-    # Home Care Recommendations
-    story.append(Paragraph("🏠 Home Care Guidelines", styles['Heading2']))
+    graph = _knowledge_base.interaction_graph()
+    edges = graph.level_of_detail(max_edges)
+    fig = go.Figure()
+    muted = center is not None
     
-    care_data = [['Category', 'Recommendation', 'Benefit']]
-    for remedy in analysis_results['home_remedies']:
-        care_data.append([
-            remedy['category'],
-            remedy['recommendation'],
-            remedy['benefit']
-        ])
+    # One WebGL line trace per severity, edges separated by gaps
+    for code, severity in enumerate(graph.severity_levels):
+        selected = edges[graph.severity_codes[edges] == code]
+        if not len(selected):
+            continue
+        xs, ys = graph.segments(selected)
+        fig.add_trace(go.Scattergl(
+            x=xs, y=ys, mode='lines', hoverinfo='skip', name=f"{severity.title()} severity",
+            line=dict(width=1, color='#cbd5e1' if muted else SEVERITY_COLORS.get(severity, '#64748b')),
+            opacity=0.4 if muted else 0.6, showlegend=not muted
+        ))
     
-    care_table = Table(care_data, colWidths=[1.2*inch, 2.5*inch, 2.8*inch])
-    care_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgreen),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('PADDING', (0, 0), (-1, -1), 8),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-    ]))
+    nodes = np.unique(np.concatenate([graph.sources[edges], graph.targets[edges]]))
+    fig.add_trace(go.Scattergl(
+        x=graph.positions[nodes, 0], y=graph.positions[nodes, 1], mode='markers', name="Drugs",
+        text=[graph.names[node].title() for node in nodes],
+        customdata=graph.degree[nodes], hovertemplate="%{text}<br>%{customdata} interactions<extra></extra>",
+        marker=dict(size=np.clip(3 + 2 * np.log1p(graph.degree[nodes]), 4, 16),
+                    color='#cbd5e1' if muted else '#1e3a8a', opacity=0.5 if muted else 0.8),
+        showlegend=False
+    ))
     
-    story.append(care_table)
-    story.append(Spacer(1, 20))
+    if muted:
+        ego = graph.ego(center)
+        ego_edges = np.array(ego.edges, dtype=np.int64)
+        for code, severity in enumerate(graph.severity_levels):
+            selected = ego_edges[graph.severity_codes[ego_edges] == code]
+            if not len(selected):
+                continue
+            xs, ys = graph.segments(selected)
+            fig.add_trace(go.Scattergl(
+                x=xs, y=ys, mode='lines', hoverinfo='skip', name=f"{severity.title()} severity",
+                line=dict(width=2, color=SEVERITY_COLORS.get(severity, '#64748b'))
+            ))
+        ego_nodes = np.array(ego.nodes, dtype=np.int64)
+        names = [graph.names[node].title() for node in ego_nodes]
+        # Partners are only labelled while the labels stay readable
+        labels = names if len(names) <= NETWORK_LABEL_LIMIT else names[:1] + [''] * (len(names) - 1)
+        fig.add_trace(go.Scattergl(
+            x=graph.positions[ego_nodes, 0], y=graph.positions[ego_nodes, 1], mode='markers+text',
+            text=labels, textposition='top center', hovertext=names,
+            customdata=graph.degree[ego_nodes], hovertemplate="%{hovertext}<br>%{customdata} interactions<extra></extra>",
+            marker=dict(size=[18] + [10] * (len(ego_nodes) - 1), color='#1e3a8a',
+                        line=dict(width=1, color='white')),
+            showlegend=False
+        ))
     
-    # Disclaimer
-    disclaimer_style = ParagraphStyle(
-        'Disclaimer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.red,
-        alignment=TA_CENTER,
-        borderWidth=1,
-        borderColor=colors.red,
-        borderPadding=10
+    fig.update_layout(
+        font=dict(color='#1e3a8a', family='Arial'),
+        height=600,
+        margin=dict(l=10, r=10, t=30, b=10),
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False, scaleanchor='x'),
+        plot_bgcolor='white',
+        legend=dict(orientation='h')
     )
-    
-    story.append(Paragraph(
-        "<b>IMPORTANT DISCLAIMER:</b><br/>"
-        "This report is generated by an AI system for informational purposes only. "
-        "It should NOT replace professional medical advice, diagnosis, or treatment. "
-        "Always consult with qualified healthcare providers for medical decisions. "
-        "The system's recommendations are based on general guidelines and may not account for individual medical history.",
-        disclaimer_style
-    ))
-    
-    doc.build(story)
-    buffer.seek(0)
-    return buffer.getvalue()
+    return fig.to_dict()
+
+
+def get_analysis_session(patient_data):
+    """Incremental analysis of the manually entered medications, kept in step with the patient details"""
+    medications = st.session_state.get('medications', [])
+    session = st.session_state.get('analysis_session')
+    if session is None or session.verifier is not st.session_state.verifier or session.medications != medications:
+        session = st.session_state.verifier.start_session(patient_data, medications)
+        st.session_state.analysis_session = session
+    else:
+        session.set_patient(patient_data)
+    return session
+
 
 def main():
     """Main Streamlit application"""
@@ -728,9 +299,9 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Initialize the verifier
+    # Sessions only hold a reference to the process-wide verifier
     if 'verifier' not in st.session_state:
-        st.session_state.verifier = MedicalPrescriptionVerifier()
+        st.session_state.verifier = load_verifier()
     
     # Sidebar for navigation
     st.sidebar.title("🧭 Navigation")
@@ -815,6 +386,12 @@ def main():
             
             st.markdown('</div>', unsafe_allow_html=True)
         
+        patient_data = {
+            'name': patient_name,
+            'age': patient_age,
+            'weight': patient_weight
+        }
+        
         # Prescription Input Section
         st.subheader("💊 Prescription Input")
         
@@ -840,11 +417,14 @@ def main():
                     if med_name and med_dosage and med_frequency:
                         if 'medications' not in st.session_state:
                             st.session_state.medications = []
-                        st.session_state.medications.append({
+                        medication = {
                             'name': med_name,
                             'dosage': med_dosage,
                             'frequency': med_frequency
-                        })
+                        }
+                        # Only the new drug is checked against the current prescription
+                        get_analysis_session(patient_data).add(medication)
+                        st.session_state.medications.append(medication)
                         st.success(f"✅ Added {med_name} to prescription")
                         st.rerun()
                     else:
@@ -865,10 +445,16 @@ def main():
                         """, unsafe_allow_html=True)
                     with col2:
                         if st.button(f"🗑️ Remove", key=f"remove_{i}"):
+                            get_analysis_session(patient_data).remove(i)
                             st.session_state.medications.pop(i)
                             st.rerun()
                 
                 medications = st.session_state.medications
+                
+                # Live feedback from the incremental analysis
+                session = get_analysis_session(patient_data)
+                st.caption(f"🩺 Live check: safety score {session.safety_score}/100, "
+                           f"{session.interaction_count} interaction(s) detected")
         
         else:  # Text Analysis
             st.markdown("### 📝 Prescription Text Analysis")
@@ -879,10 +465,19 @@ def main():
                 key="prescription_text"
             )
             
+            uploaded_notes = st.file_uploader("📎 Or upload clinic notes (.txt)", type=['txt'])
+            
             if st.button("🔍 Extract Medications from Text", use_container_width=True):
-                if prescription_text:
+                if prescription_text or uploaded_notes:
                     with st.spinner("🔍 Analyzing prescription text..."):
-                        medications = extract_medications_from_text(prescription_text)
+                        knowledge_base = st.session_state.verifier.knowledge_base
+                        if uploaded_notes is not None:
+                            # Large uploads are scanned in chunks rather than decoded in one piece
+                            notes = io.TextIOWrapper(uploaded_notes, encoding='utf-8', errors='replace')
+                            medications = list(stream_medications(notes, uploaded_notes.name,
+                                                                  knowledge_base.name_automaton()))
+                        else:
+                            medications = extract_medications_from_text(prescription_text, knowledge_base)
                         st.session_state.extracted_medications = medications
                     
                     if medications:
@@ -916,14 +511,11 @@ def main():
             
             if analyze_clicked:
                 with st.spinner("🔍 Analyzing prescription... Please wait"):
-                    patient_data = {
-                        'name': patient_name,
-                        'age': patient_age,
-                        'weight': patient_weight
-                    }
-                    
                     # Perform analysis
-                    analysis_results = st.session_state.verifier.analyze_prescription(patient_data, medications)
+                    if input_method == "Manual Entry":
+                        analysis_results = get_analysis_session(patient_data).results()
+                    else:
+                        analysis_results = st.session_state.verifier.analyze_prescription(patient_data, medications)
                     st.session_state.analysis_results = analysis_results
                     
                     # Small delay for better UX
@@ -942,6 +534,7 @@ def main():
                 col1, col2, col3 = st.columns([2, 1, 1])
                 with col1:
                     # Create gauge chart for safety score
+                    import plotly.graph_objects as go
                     fig = go.Figure(go.Indicator(
                         mode = "gauge+number+delta",
                         value = safety_score,
@@ -1082,7 +675,7 @@ def main():
                 col1, col2, col3 = st.columns([1, 2, 1])
                 with col2:
                     if "analysis_results" in st.session_state:
-                        pdf_bytes = generate_pdf_report(st.session_state.analysis_results)
+                        pdf_bytes = cached_pdf_report(st.session_state.analysis_results)
 
                         st.download_button(
                             label="📥 Download PDF Report",
@@ -1126,88 +719,114 @@ def main():
         
         # Display drug database
         verifier = st.session_state.verifier
+        catalog = verifier.knowledge_base.drug_catalog()
         
+        search_index = verifier.knowledge_base.search_index()
         if search_term:
-            # Filter drugs based on search term
-            filtered_drugs = {k: v for k, v in verifier.drug_database.items() 
-                            if search_term.lower() in k.lower() or search_term.lower() in v['generic_name'].lower()}
+            # Ranked matches on names, aliases, generic names, categories and safety information
+            result = search_index.search(search_term, limit=SEARCH_RESULT_LIMIT)
+            drug_ids, total, category_counts = result.ids, result.total, result.category_counts
+            # The index filters by category itself, so there are no per-category id lists here
+            category_ids = None
             
-            if filtered_drugs:
-                st.success(f"✅ Found {len(filtered_drugs)} drug(s) matching '{search_term}'")
+            if drug_ids:
+                st.success(f"✅ Found {total} drug(s) matching '{search_term}'")
             else:
-                st.error(f"❌ No drugs found matching '{search_term}'")
-                st.info("💡 Try searching with generic names or check spelling")
-        else:
-            filtered_drugs = verifier.drug_database
-            st.info(f"📋 Showing all {len(filtered_drugs)} drugs in database")
-        
-        if filtered_drugs:
-            # Create tabs for different categories
-            categories = list(set(drug['category'] for drug in filtered_drugs.values()))
-            if len(categories) > 1:
-                tabs = st.tabs(["🌟 All"] + [f"📂 {cat}" for cat in sorted(categories)])
-                
-                with tabs[0]:
-                    display_drugs(filtered_drugs)
+                # Fall back to approximate matches for misspelled names
+                matches = verifier.knowledge_base.fuzzy_matcher().match(search_term)
+                drug_ids = catalog.ids_for(dict.fromkeys(match.target for match in matches))
                 
-                for i, category in enumerate(sorted(categories), 1):
-                    with tabs[i]:
-                        cat_drugs = {k: v for k, v in filtered_drugs.items() if v['category'] == category}
-                        display_drugs(cat_drugs)
-            else:
-                display_drugs(filtered_drugs)
+                if drug_ids:
+                    suggestions = ', '.join(catalog.names[drug_id].title() for drug_id in drug_ids)
+                    st.warning(f"🔎 No exact match for '{search_term}'. Closest matches: {suggestions}")
+                else:
+                    st.error(f"❌ No drugs found matching '{search_term}'")
+                    st.info("💡 Try searching with generic names or check spelling")
+                category_ids = catalog.by_category(drug_ids)
+                total = len(drug_ids)
+                category_counts = {category: len(ids) for category, ids in category_ids.items()}
+        else:
+            drug_ids = catalog.all_ids
+            total = len(drug_ids)
+            category_ids = catalog.category_ids
+            category_counts = {category: len(catalog.category_ids[category]) for category in catalog.categories}
+            st.info(f"📋 Showing all {len(drug_ids)} drugs in database")
+        
+        if drug_ids:
+            # Only the selected category's current page is rendered
+            choice = 0
+            matched = total
+            if len(category_counts) > 1:
+                options = [("🌟 All", None, total)] + [(f"📂 {cat}", cat, count) for cat, count in category_counts.items()]
+                choice = st.radio("Category", range(len(options)), horizontal=True,
+                                  format_func=lambda i: f"{options[i][0]} ({options[i][2]})",
+                                  label_visibility="collapsed", key=f"drug_category_{search_term}")
+                category, matched = options[choice][1:]
+                if category is not None and category_ids is None:
+                    drug_ids = search_index.search(search_term, limit=SEARCH_RESULT_LIMIT, category=category).ids
+                elif category is not None:
+                    drug_ids = category_ids[category]
+            if matched > len(drug_ids):
+                st.caption(f"Listing the {len(drug_ids)} best of {matched} matches")
+            
+            page_col1, page_col2 = st.columns([3, 1])
+            with page_col2:
+                page_size = st.selectbox("Per page", [10, 20, 50, 100], index=1, key="drug_page_size")
+            # The catalogue clamps the requested page and counts the pages
+            page_key = f"drug_page_{search_term}_{choice}_{page_size}"
+            page = catalog.page(drug_ids, st.session_state.get(page_key, 1), page_size)
+            with page_col1:
+                st.number_input(f"Page (of {page.count})", min_value=1, max_value=page.count, value=page.number,
+                                step=1, key=page_key)
+            
+            first = (page.number - 1) * page_size + 1
+            st.caption(f"Showing {first}–{first + len(page.names) - 1} of {page.total} drugs")
+            display_drugs({name: verifier.drug_database[name] for name in page.names})
         
         # Drug statistics
         st.markdown("---")
         st.subheader("📊 Database Statistics")
         
+        # Aggregates and figures only change with the drug data, so they are cached on its checksum
+        knowledge_base = verifier.knowledge_base
+        stats = database_statistics(knowledge_base.checksum, knowledge_base)
+        
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("💊 Total Drugs", len(verifier.drug_database), delta="Comprehensive")
+            st.metric("💊 Total Drugs", stats['drugs'], delta="Comprehensive")
         with col2:
-            categories = set(drug['category'] for drug in verifier.drug_database.values())
-            st.metric("📂 Categories", len(categories), delta="Diverse")
+            st.metric("📂 Categories", stats['categories'], delta="Diverse")
         with col3:
-            total_interactions = len(verifier.interaction_database)
-            st.metric("🔄 Known Interactions", total_interactions, delta="Safety focused")
+            st.metric("🔄 Known Interactions", stats['interactions'], delta="Safety focused")
         with col4:
-            st.metric("👥 Age Groups", len(verifier.dosage_guidelines), delta="All ages")
+            st.metric("👥 Age Groups", stats['age_groups'], delta="All ages")
         
         # Category breakdown chart
         st.subheader("📈 Drug Distribution by Category")
-        category_counts = {}
-        for drug in verifier.drug_database.values():
-            category = drug['category']
-            category_counts[category] = category_counts.get(category, 0) + 1
-        
-        # Create a colorful pie chart
-        fig = px.pie(
-            values=list(category_counts.values()),
-            names=list(category_counts.keys()),
-            title="Distribution of Drugs by Medical Category",
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        fig.update_layout(
-            font=dict(color='#1e3a8a', family='Arial'),
-            title_font_size=16,
-            showlegend=True
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(category_chart(knowledge_base.checksum, knowledge_base), use_container_width=True)
         
         # Interaction network visualization
         st.subheader("🕸️ Drug Interaction Network")
-        if verifier.interaction_database:
-            interaction_data = []
-            for (drug1, drug2), info in verifier.interaction_database.items():
-                interaction_data.append({
-                    'Drug 1': drug1.title(),
-                    'Drug 2': drug2.title(),
-                    'Severity': info['severity'].title(),
-                    'Description': info['description']
-                })
+        if stats['interactions']:
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                focus = st.text_input("🎯 Focus on a drug", placeholder="e.g., warfarin", key="network_focus")
+            with col2:
+                max_edges = st.select_slider("Interactions drawn", options=NETWORK_EDGE_BUDGETS, value=2000)
+            
+            center = None
+            if focus.strip():
+                center = knowledge_base.interaction_graph().node_id(focus, knowledge_base)
+                if center is None:
+                    st.warning(f"No known interactions for '{focus}'")
+            
+            st.plotly_chart(interaction_network_chart(knowledge_base.checksum, knowledge_base, center, max_edges),
+                            use_container_width=True)
+            if stats['interactions'] > max_edges:
+                st.caption(f"Showing the {max_edges} most severe of {stats['interactions']} interactions")
             
-            interaction_df = pd.DataFrame(interaction_data)
-            st.dataframe(interaction_df, use_container_width=True)
+            with st.expander("📋 All Known Interactions"):
+                st.dataframe(interaction_table(knowledge_base.checksum, knowledge_base), use_container_width=True)
         else:
             st.info("No interaction data available for visualization")
     
@@ -0,0 +1,39 @@
+"""UI-free core of the AI Medical Prescription Verification System.
+
+Submodules are imported lazily so that ``import medverify`` stays cheap;
+heavy dependencies such as ReportLab are only loaded when a report is built.
+"""
+
+import importlib
+
+__all__ = [
+    'AnalysisSession',
+    'MedicalPrescriptionVerifier',
+    'cached_pdf_report',
+    'extract_medications_from_text',
+    'generate_pdf_report',
+    'generate_pdf_reports',
+    'stream_medications',
+]
+
+_LAZY_ATTRIBUTES = {
+    'AnalysisSession': 'medverify.session',
+    'MedicalPrescriptionVerifier': 'medverify.verifier',
+    'cached_pdf_report': 'medverify.report_cache',
+    'extract_medications_from_text': 'medverify.extraction',
+    'generate_pdf_report': 'medverify.report',
+    'generate_pdf_reports': 'medverify.bulk_reports',
+    'stream_medications': 'medverify.extraction',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module 'medverify' has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,118 @@
+"""Age-group lookup and per-drug age limits, compiled once per knowledge base"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Optional, Tuple
+
+# Group for ages outside every dosage guideline, as in the original linear scan
+DEFAULT_GROUP = 'adult'
+
+
+class AgeRules:
+    """Numeric age rules for a knowledge base.
+
+    The dosage-guideline boundaries are expanded into a list indexed by whole
+    years, so finding a patient's group is one lookup. Drug restrictions are
+    the records' numeric ``min_age``/``max_age``, any number of distinct
+    cutoffs; the sorted cutoffs let ``band`` summarise an age by which side
+    of every cutoff it falls on.
+    """
+
+    def __init__(self, knowledge_base):
+        self._guidelines = knowledge_base.dosage_guidelines
+        self.groups: Tuple[str, ...] = tuple(self._guidelines)
+        if DEFAULT_GROUP not in self.groups:
+            self.groups += (DEFAULT_GROUP,)
+        top = max((int(criteria['max_age']) for criteria in self._guidelines.values()), default=-1)
+        self._group_by_year = [self._scan(age) for age in range(top + 1)]
+
+        self._drug_database = knowledge_base.drug_database
+        self.limits: Dict[str, Tuple[Optional[float], Optional[float]]] = _age_limits(self._drug_database)
+        self._drug_ids: Optional[Dict[str, int]] = None
+        self._min_cutoffs = sorted({low for low, _ in self.limits.values() if low is not None})
+        self._max_cutoffs = sorted({high for _, high in self.limits.values() if high is not None})
+        self._arrays = None
+
+    @property
+    def drug_ids(self) -> Dict[str, int]:
+        """Drug numbering for the vectorized checks, built on first use"""
+        if self._drug_ids is None:
+            self._drug_ids = {name: drug_id for drug_id, name in enumerate(self._drug_database)}
+        return self._drug_ids
+
+    def _scan(self, age) -> str:
+        for group, criteria in self._guidelines.items():
+            if criteria['min_age'] <= age <= criteria['max_age']:
+                return group
+        return DEFAULT_GROUP
+
+    def group(self, age) -> str:
+        """Dosage-guideline group for an age"""
+        if 0 <= age < len(self._group_by_year) and age == int(age):
+            return self._group_by_year[int(age)]
+        return self._scan(age)
+
+    def allows(self, drug_name: str, age) -> bool:
+        """Whether the drug's age limits admit the patient"""
+        limits = self.limits.get(drug_name)
+        if limits is None:
+            return True
+        min_age, max_age = limits
+        return (min_age is None or age >= min_age) and (max_age is None or age <= max_age)
+
+    def band(self, age) -> Tuple[int, int]:
+        """Position of an age among all cutoffs; equal bands get equal ``allows`` results for every drug"""
+        return bisect_right(self._min_cutoffs, age), bisect_left(self._max_cutoffs, age)
+
+    def _vectors(self):
+        import numpy as np
+
+        if self._arrays is None:
+            drug_ids = self.drug_ids
+            group_codes = np.array([self.groups.index(group) for group in self._group_by_year], dtype=np.int64)
+            # One extra unrestricted slot at the end for unknown drugs (id -1)
+            min_ages = np.full(len(drug_ids) + 1, -np.inf)
+            max_ages = np.full(len(drug_ids) + 1, np.inf)
+            for name, (min_age, max_age) in self.limits.items():
+                if min_age is not None:
+                    min_ages[drug_ids[name]] = min_age
+                if max_age is not None:
+                    max_ages[drug_ids[name]] = max_age
+            self._arrays = group_codes, min_ages, max_ages
+        return self._arrays
+
+    def group_codes(self, ages):
+        """Indexes into ``groups`` for an array of ages"""
+        import numpy as np
+
+        group_codes, _, _ = self._vectors()
+        ages = np.asarray(ages, dtype=np.float64)
+        whole = np.floor(ages)
+        inside = (whole == ages) & (ages >= 0) & (ages < len(group_codes))
+        codes = np.empty(len(ages), dtype=np.int64)
+        codes[inside] = group_codes[whole[inside].astype(np.int64)]
+        for i in np.flatnonzero(~inside):
+            codes[i] = self.groups.index(self._scan(ages[i]))
+        return codes
+
+    def check(self, drug_ids, ages):
+        """Boolean array, True where each drug's age limits admit the age; -1 marks unknown drugs"""
+        import numpy as np
+
+        _, min_ages, max_ages = self._vectors()
+        drug_ids = np.asarray(drug_ids, dtype=np.int64)
+        ages = np.asarray(ages, dtype=np.float64)
+        return (ages >= min_ages[drug_ids]) & (ages <= max_ages[drug_ids])
+
+
+def _age_limits(drug_database) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """Age limits of the restricted drugs; snapshots provide them without decoding each record"""
+    if hasattr(drug_database, 'age_limits'):
+        limits = drug_database.age_limits()
+        if limits is not None:
+            return limits
+    limits = {}
+    for name, record in drug_database.items():
+        min_age, max_age = record.get('min_age'), record.get('max_age')
+        if min_age is not None or max_age is not None:
+            limits[name] = (min_age, max_age)
+    return limits
@@ -0,0 +1,154 @@
+"""Aho-Corasick automaton for finding known drug names in free text"""
+
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .dataset import normalize_name
+
+_WHITESPACE = frozenset(' \t\n\r\f\v')
+_TO_SPACE = str.maketrans({char: ' ' for char in _WHITESPACE})
+
+
+class Mention(NamedTuple):
+    start: int    # character offsets of the mention in the scanned text
+    end: int
+    name: str     # indexed name that was found (drug name or alias)
+    target: str   # canonical name it resolves to
+
+
+class NameAutomaton:
+    """Aho-Corasick automaton over normalized drug names and aliases.
+
+    Every name is inserted into a character trie; failure links turn the
+    trie into an automaton that finds all occurrences of all names in one
+    pass over the text, whatever the number of names. Transitions are
+    resolved through the failure links on first use and then memoized, so
+    the scan is a single dictionary lookup per character. Runs of
+    whitespace in the text match the single space in multi-word names, and
+    only mentions that start and end on word boundaries are reported.
+    """
+
+    def __init__(self, names: Iterable[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[Tuple[str, str]]] = [None]  # longest name ending in the state
+        self._output_link: List[int] = [0]                    # next state with a (shorter) output
+        after_space = []
+        self.longest = 0   # characters in the longest name
+
+        for name, target in names:
+            name = normalize_name(name)
+            if not name:
+                continue
+            self.longest = max(self.longest, len(name))
+            state = 0
+            for char in name:
+                following = self._goto[state].get(char)
+                if following is None:
+                    following = len(self._goto)
+                    self._goto[state][char] = following
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                    self._output_link.append(0)
+                    if char == ' ':
+                        after_space.append(following)
+                state = following
+            if self._output[state] is None:
+                self._output[state] = (name, target)
+
+        self._link()
+        # Memoized transitions: trie edges first, the rest filled in by _step
+        self._delta: List[Dict[str, int]] = [dict(edges) for edges in self._goto]
+        # Further spaces after a space stay put, so whitespace runs match one space
+        for state in after_space:
+            self._delta[state][' '] = state
+        self._reports = [output is not None or bool(link) for output, link in zip(self._output, self._output_link)]
+
+    def __len__(self) -> int:
+        return sum(output is not None for output in self._output)
+
+    def _link(self) -> None:
+        """Compute failure and output links breadth-first"""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, following in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                fail = self._goto[fallback].get(char, 0)
+                self._fail[following] = fail
+                self._output_link[following] = fail if self._output[fail] is not None else self._output_link[fail]
+                queue.append(following)
+
+    def _step(self, state: int, char: str) -> int:
+        """Transition for ``char``, following failure links, memoized on the state"""
+        origin = state
+        while True:
+            following = self._goto[state].get(char)
+            if following is not None:
+                break
+            if state == 0:
+                following = 0
+                break
+            state = self._fail[state]
+        self._delta[origin][char] = following
+        return following
+
+    def iter_mentions(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Mention]:
+        """Yield every name occurrence in ``text[start:end]`` on word boundaries, by end offset"""
+        delta = self._delta
+        output = self._output
+        output_link = self._output_link
+        reports = self._reports
+        step = self._step
+        state = 0
+        length = len(text)
+        end = length if end is None else end
+        lowered = text[start:end].lower()
+        if len(lowered) != end - start:
+            # A few characters lowercase to several; keep offsets aligned with the text
+            lowered = ''.join(char.lower()[0] for char in text[start:end])
+        for offset, char in enumerate(lowered.translate(_TO_SPACE), start):
+            following = delta[state].get(char)
+            state = step(state, char) if following is None else following
+            if not reports[state]:
+                continue
+            if offset + 1 < length and _is_word_char(text[offset + 1]):
+                continue
+            found = state if output[state] is not None else output_link[state]
+            while found:
+                name, target = output[found]
+                mention_start = self._start_offset(text, offset + 1, len(name))
+                if mention_start == 0 or not _is_word_char(text[mention_start - 1]):
+                    yield Mention(mention_start, offset + 1, name, target)
+                found = output_link[found]
+
+    @staticmethod
+    def _start_offset(text: str, end: int, length: int) -> int:
+        """Start of a normalized name of ``length`` characters ending at ``end``"""
+        position = end
+        while length:
+            position -= 1
+            if text[position] in _WHITESPACE:
+                while position > 0 and text[position - 1] in _WHITESPACE:
+                    position -= 1
+            length -= 1
+        return position
+
+    def find(self, text: str) -> List[Mention]:
+        """Leftmost-longest, non-overlapping mentions in ``text``"""
+        return select_mentions(self.iter_mentions(text))
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char in '-_'
+
+
+def select_mentions(mentions: Iterable[Mention]) -> List[Mention]:
+    """Keep the leftmost-longest mentions so that none overlap"""
+    selected = []
+    for mention in sorted(mentions, key=lambda m: (m.start, -m.end)):
+        if selected and mention.start < selected[-1].end:
+            continue
+        selected.append(mention)
+    return selected
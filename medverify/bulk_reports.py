@@ -0,0 +1,132 @@
+"""Bulk PDF report generation across worker processes.
+
+Analysis results (for example the JSONL written by ``python -m medverify
+verify``) are rendered in chunks by a process pool and handed back in input
+order, so they can be written to a directory or streamed into a zip archive
+one report at a time::
+
+    python -m medverify reports results.jsonl -o reports.zip --workers 8
+
+Only ``max_in_flight`` chunks are held in memory at once. Records that fail
+to parse or render are reported with their error instead of stopping the run.
+"""
+
+import json
+import os
+import re
+import time
+import zipfile
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+# Reports per work unit; rendering one takes milliseconds, so chunks stay small
+DEFAULT_CHUNK_SIZE = 20
+
+_UNSAFE_NAME_RE = re.compile(r'[^\w.-]+')
+
+
+class ReportOutcome(NamedTuple):
+    report_id: object
+    pdf: Optional[bytes]   # None if the report failed
+    error: Optional[str]
+
+
+def _load_template():
+    """Worker initializer: import ReportLab and build the shared template once"""
+    from .report import get_report_template
+    get_report_template()
+
+
+def _parse_result(item) -> Tuple[object, Dict]:
+    if isinstance(item, dict):
+        return item.get('id'), item
+    line_number, line = item
+    result = json.loads(line)
+    if not isinstance(result, dict):
+        raise ValueError("result is not a JSON object")
+    report_id = result.get('id', line_number)
+    if 'error' in result and 'patient_info' not in result:
+        raise ValueError(f"verification failed: {result['error']}")
+    return report_id, result
+
+
+def render_chunk(chunk: List) -> Tuple[List[ReportOutcome], float]:
+    """Render one chunk of results; returns the outcomes and processing time.
+
+    Items are result dicts or raw ``(line_number, line)`` JSONL pairs, which
+    are parsed here. A failure only affects its own report.
+    """
+    from .report import generate_pdf_report
+
+    started = time.perf_counter()
+    outcomes = []
+    for item in chunk:
+        report_id = item.get('id') if isinstance(item, dict) else item[0]
+        try:
+            report_id, result = _parse_result(item)
+            outcomes.append(ReportOutcome(report_id, generate_pdf_report(result), None))
+        except Exception as exc:
+            outcomes.append(ReportOutcome(report_id, None, f"{type(exc).__name__}: {exc}"))
+    return outcomes, time.perf_counter() - started
+
+
+def generate_pdf_reports(results: Iterable, workers: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         max_in_flight: Optional[int] = None) -> Iterator[ReportOutcome]:
+    """Render many reports, yielding a ``ReportOutcome`` per result in input order.
+
+    ``results`` yields analysis result dicts (an ``id`` key names the report)
+    or ``(line_number, json_line)`` pairs. ``workers=0`` renders in-process.
+    """
+    from .cli import _chunks, run_ordered
+
+    max_in_flight = max_in_flight or max(2, 2 * workers)
+    for outcomes, _ in run_ordered(_chunks(results, chunk_size), workers, max_in_flight,
+                                   process=render_chunk, initializer=_load_template):
+        yield from outcomes
+
+
+def report_filename(report_id, used: Set[str]) -> str:
+    """A safe, unique ``<id>.pdf`` name; repeated ids get a numeric suffix"""
+    stem = _UNSAFE_NAME_RE.sub('_', str(report_id)).strip('._') or 'report'
+    name = f"{stem}.pdf"
+    suffix = 1
+    while name in used:
+        suffix += 1
+        name = f"{stem}-{suffix}.pdf"
+    used.add(name)
+    return name
+
+
+class ReportDirectory:
+    """Writes each report as a file in a directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, name: str, pdf: bytes) -> None:
+        with open(os.path.join(self.path, name), 'wb') as f:
+            f.write(pdf)
+
+    def close(self) -> None:
+        pass
+
+
+class ReportArchive:
+    """Streams reports into a zip archive, one member at a time"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, name: str, pdf: bytes) -> None:
+        self._zip.writestr(name, pdf)
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+def open_report_output(path: str):
+    """A zip archive for ``.zip`` paths, otherwise a directory"""
+    if path.lower().endswith('.zip'):
+        return ReportArchive(path)
+    return ReportDirectory(path)
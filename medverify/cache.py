@@ -0,0 +1,109 @@
+"""Bounded LRU caches for analysis results"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def approximate_size(value) -> int:
+    """Rough memory footprint of a value built from dicts, lists, tuples and scalars"""
+    seen = set()
+    stack = [value]
+    size = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return size
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache bounded by entry count and memory.
+
+    Entries are charged their ``approximate_size`` when stored, and the least
+    recently used ones are evicted once either limit is exceeded. ``bind``
+    ties the contents to a knowledge-base checksum and clears them when it
+    changes, so results computed against old data are never returned.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = DEFAULT_MAX_BYTES, max_entries: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._token = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value, size: Optional[int] = None) -> None:
+        if size is None:
+            size = approximate_size(value)
+        with self._lock:
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while ((self.max_bytes is not None and self._bytes > self.max_bytes)
+                   or (self.max_entries is not None and len(self._entries) > self.max_entries)):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def bind(self, token: Hashable) -> None:
+        """Clear the cache if ``token`` (e.g. a knowledge-base checksum) has changed"""
+        if token != self._token:
+            with self._lock:
+                if token != self._token:
+                    self._entries.clear()
+                    self._bytes = 0
+                    self._token = token
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self._entries), self._bytes)
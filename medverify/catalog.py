@@ -0,0 +1,57 @@
+"""Drug catalogue index for browsing: per-category id lists and pagination"""
+
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+DEFAULT_PAGE_SIZE = 20
+
+
+class Page(NamedTuple):
+    names: List[str]   # drug record names on this page
+    number: int        # 1-based, clamped to the available pages
+    count: int         # number of pages (at least 1)
+    total: int         # number of drugs across all pages
+
+
+class DrugCatalog:
+    """Drug names numbered in knowledge-base order, grouped by category.
+
+    Built once per knowledge base; browsing a category or a page only
+    slices precomputed id lists, whatever the size of the catalogue.
+    """
+
+    def __init__(self, knowledge_base):
+        self.names: List[str] = []
+        self.category_of: List[str] = []
+        category_ids: Dict[str, List[int]] = {}
+        for drug_id, (name, record) in enumerate(knowledge_base.drug_database.items()):
+            self.names.append(name)
+            self.category_of.append(record['category'])
+            category_ids.setdefault(record['category'], []).append(drug_id)
+        self.ids: Dict[str, int] = {name: drug_id for drug_id, name in enumerate(self.names)}
+        self.categories: List[str] = sorted(category_ids)
+        self.category_ids: Dict[str, Tuple[int, ...]] = {category: tuple(ids)
+                                                          for category, ids in category_ids.items()}
+        self.all_ids: Tuple[int, ...] = tuple(range(len(self.names)))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def ids_for(self, names: Iterable[str]) -> List[int]:
+        """Ids of the given record names, skipping unknown ones"""
+        return [self.ids[name] for name in names if name in self.ids]
+
+    def by_category(self, drug_ids: Sequence[int]) -> Dict[str, List[int]]:
+        """Split a subset of ids by category, keeping their order; categories sorted"""
+        grouped: Dict[str, List[int]] = {}
+        for drug_id in drug_ids:
+            grouped.setdefault(self.category_of[drug_id], []).append(drug_id)
+        return {category: grouped[category] for category in sorted(grouped)}
+
+    def page(self, drug_ids: Sequence[int], number: int, page_size: int = DEFAULT_PAGE_SIZE) -> Page:
+        """Names of the drugs on 1-based page ``number`` of ``drug_ids``"""
+        page_size = max(1, page_size)
+        count = max(1, -(-len(drug_ids) // page_size))
+        number = min(max(1, number), count)
+        start = (number - 1) * page_size
+        return Page([self.names[drug_id] for drug_id in drug_ids[start:start + page_size]],
+                    number, count, len(drug_ids))
@@ -0,0 +1,329 @@
+"""Command-line batch verifier and bulk report renderer.
+
+Streams prescriptions from JSONL or CSV files (or stdin) through a pool of
+worker processes and writes one JSON result per line, in input order::
+
+    python -m medverify verify dispensing.jsonl -o results.jsonl --workers 8
+    zcat export.csv.gz | python -m medverify verify --format csv > results.jsonl
+
+JSONL input has one prescription per line: either ``{"patient": {...},
+"medications": [...]}`` or the patient fields (``name``, ``age``,
+``weight``) next to ``medications``. An ``id`` field, if present, is copied
+to the output.
+
+CSV input has one row per medication, with columns ``prescription_id``,
+``patient_name``, ``age``, ``weight``, ``medication``, ``dosage`` and
+``frequency``. Consecutive rows with the same ``prescription_id`` form one
+prescription. A prescription whose age is blank or not a number is written
+as an error record; a blank weight is passed on as unknown.
+
+At most ``--max-in-flight`` chunks of ``--chunk-size`` prescriptions are
+held in memory at once, so arbitrarily large inputs stream through in
+constant memory. A throughput and latency summary is printed to stderr.
+
+``python -m medverify reports`` renders PDF reports from those results; see
+``medverify.bulk_reports``.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+_verifier = None
+
+
+def _get_verifier():
+    """Per-process verifier; workers build it once and reuse it for every chunk"""
+    global _verifier
+    if _verifier is None:
+        from .verifier import MedicalPrescriptionVerifier
+        _verifier = MedicalPrescriptionVerifier()
+        _verifier.safety_scorer  # build the batch scorer before the first chunk
+    return _verifier
+
+
+def _number(value, default=None):
+    if value in (None, ''):
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return int(number) if number.is_integer() else number
+
+
+def parse_jsonl_record(line_number: int, line: str) -> Dict:
+    """Parse one JSON line into a prescription record; bad lines become error records"""
+    try:
+        record = json.loads(line)
+    except ValueError as exc:
+        return {'id': line_number, 'error': f"invalid JSON: {exc}"}
+    if not isinstance(record, dict) or 'medications' not in record:
+        return {'id': record.get('id', line_number) if isinstance(record, dict) else line_number,
+                'error': "record has no 'medications' field"}
+    record.setdefault('id', line_number)
+    if 'patient' not in record:
+        record['patient'] = {key: value for key, value in record.items() if key not in ('id', 'medications')}
+    return record
+
+
+def read_jsonl(stream: TextIO) -> Iterator[Tuple[int, str]]:
+    """Yield ``(line_number, line)`` for non-blank lines; workers do the parsing"""
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            yield line_number, line
+
+
+def read_csv(stream: TextIO) -> Iterator[Dict]:
+    """Yield prescription records from one-row-per-medication CSV"""
+    current = None
+    for row in csv.DictReader(stream):
+        prescription_id = row.get('prescription_id') or row.get('id') or ''
+        if current is None or prescription_id != current['id']:
+            if current is not None:
+                yield current
+            current = {
+                'id': prescription_id,
+                'patient': {
+                    'name': row.get('patient_name') or row.get('name') or '',
+                    'age': _number(row.get('age')),
+                    'weight': _number(row.get('weight')),
+                },
+                'medications': [],
+            }
+            if current['patient']['age'] is None:
+                # Analysing an unknown age as 0 would flag age limits meant for newborns
+                current['error'] = f"missing or invalid age: {row.get('age')!r}"
+        if row.get('medication'):
+            current['medications'].append({
+                'name': row['medication'],
+                'dosage': row.get('dosage') or '',
+                'frequency': row.get('frequency') or '',
+            })
+    if current is not None:
+        yield current
+
+
+def _chunks(records: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _encode(record_id, results: Dict) -> str:
+    return json.dumps({'id': record_id, **results}, ensure_ascii=False, default=str)
+
+
+def _error_line(record_id, message: str) -> str:
+    return json.dumps({'id': record_id, 'error': message}, ensure_ascii=False, default=str)
+
+
+def verify_chunk(chunk: List) -> Tuple[List[str], int, float]:
+    """Verify one chunk of records; returns JSON lines, error count and processing time.
+
+    Runs in worker processes. Items are CSV records or raw JSONL lines, which
+    are parsed here to keep the reading process light. The chunk is analyzed
+    as one batch; if that fails, records are retried one by one so a bad
+    record only fails itself.
+    """
+    started = time.perf_counter()
+    verifier = _get_verifier()
+    chunk = [item if isinstance(item, dict) else parse_jsonl_record(*item) for item in chunk]
+    valid = [record for record in chunk if 'error' not in record]
+    lines = {}
+    errors = len(chunk) - len(valid)
+    try:
+        columns = verifier.analyze_prescriptions((r['patient'], r['medications']) for r in valid)
+        for i, record in enumerate(valid):
+            lines[id(record)] = _encode(record['id'], {field: columns[field][i] for field in columns})
+    except Exception:
+        for record in valid:
+            try:
+                results = verifier.analyze_prescription(record['patient'], record['medications'])
+                lines[id(record)] = _encode(record['id'], results)
+            except Exception as exc:
+                lines[id(record)] = _error_line(record['id'], f"{type(exc).__name__}: {exc}")
+                errors += 1
+    output = [lines.get(id(record)) or _error_line(record['id'], record['error']) for record in chunk]
+    return output, errors, time.perf_counter() - started
+
+
+def run_ordered(chunks: Iterable[List], workers: int, max_in_flight: int,
+                process=verify_chunk, initializer=_get_verifier) -> Iterator:
+    """Yield ``process(chunk)`` results in input order with bounded look-ahead"""
+    if workers <= 0:
+        for chunk in chunks:
+            yield process(chunk)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Workers load their state up front so it is not billed to the first chunk
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(process, chunk))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _open_inputs(paths: List[str]) -> Iterator[TextIO]:
+    for path in paths or ['-']:
+        if path == '-':
+            yield io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        else:
+            with open(path, encoding='utf-8', newline='') as stream:
+                yield stream
+
+
+def _input_format(paths: List[str], requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    if paths and all(path.lower().endswith('.csv') for path in paths):
+        return 'csv'
+    return 'jsonl'
+
+
+def verify_command(args) -> int:
+    reader = read_csv if _input_format(args.inputs, args.format) == 'csv' else read_jsonl
+    records = (record for stream in _open_inputs(args.inputs) for record in reader(stream))
+    workers = (os.cpu_count() or 1) if args.workers is None else args.workers
+    max_in_flight = args.max_in_flight or max(2, 2 * workers)
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    started = time.perf_counter()
+    count = errors = 0
+    chunk_times = []
+    try:
+        for lines, chunk_errors, seconds in run_ordered(_chunks(records, args.chunk_size), workers, max_in_flight):
+            for line in lines:
+                output.write(line)
+                output.write('\n')
+            count += len(lines)
+            errors += chunk_errors
+            chunk_times.append(seconds)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        else:
+            output.flush()
+
+    if not args.quiet:
+        elapsed = time.perf_counter() - started
+        chunk_times.sort()
+        per_record = sum(chunk_times) / count * 1000 if count else 0.0
+        print(f"Verified {count} prescriptions ({errors} errors) in {elapsed:.2f} s "
+              f"with {workers or 'no'} worker(s): {count / elapsed if elapsed else 0:.0f} prescriptions/s",
+              file=sys.stderr)
+        print(f"Chunk latency: p50 {_percentile(chunk_times, 0.5) * 1000:.1f} ms, "
+              f"p95 {_percentile(chunk_times, 0.95) * 1000:.1f} ms, "
+              f"max {(chunk_times[-1] if chunk_times else 0) * 1000:.1f} ms; "
+              f"{per_record:.3f} ms of worker time per prescription",
+              file=sys.stderr)
+    return 0
+
+
+def reports_command(args) -> int:
+    from .bulk_reports import generate_pdf_reports, open_report_output, report_filename
+
+    results = (item for stream in _open_inputs(args.inputs) for item in read_jsonl(stream))
+    workers = (os.cpu_count() or 1) if args.workers is None else args.workers
+    output = open_report_output(args.output)
+    failures = open(args.failures, 'w', encoding='utf-8') if args.failures else None
+    started = last_progress = time.perf_counter()
+    count = failed = 0
+    names = set()
+    try:
+        for outcome in generate_pdf_reports(results, workers, args.chunk_size, args.max_in_flight):
+            count += 1
+            if outcome.error is None:
+                output.write(report_filename(outcome.report_id, names), outcome.pdf)
+            else:
+                failed += 1
+                if failures is not None:
+                    failures.write(_error_line(outcome.report_id, outcome.error) + '\n')
+                if not args.quiet:
+                    print(f"Report {outcome.report_id} failed: {outcome.error}", file=sys.stderr)
+            now = time.perf_counter()
+            if not args.quiet and now - last_progress >= args.progress_interval:
+                last_progress = now
+                print(f"{count} reports ({failed} failed), {count / (now - started):.1f} reports/s",
+                      file=sys.stderr)
+    finally:
+        output.close()
+        if failures is not None:
+            failures.close()
+
+    if not args.quiet:
+        elapsed = time.perf_counter() - started
+        print(f"Rendered {count - failed} of {count} reports to {args.output} in {elapsed:.2f} s "
+              f"with {workers or 'no'} worker(s): {count / elapsed if elapsed else 0:.1f} reports/s",
+              file=sys.stderr)
+    return 1 if failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m medverify',
+                                     description='Headless prescription verification tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    verify = commands.add_parser('verify', help='verify prescriptions from JSONL/CSV, writing JSONL results')
+    verify.add_argument('inputs', nargs='*', help="input files ('-' or none for stdin)")
+    verify.add_argument('-o', '--output', default='-', help='output JSONL file (default: stdout)')
+    verify.add_argument('--format', choices=('jsonl', 'csv'),
+                        help='input format (default: csv for .csv files, otherwise jsonl)')
+    verify.add_argument('-w', '--workers', type=int,
+                        help='worker processes (default: CPU count; 0 runs in-process)')
+    verify.add_argument('--chunk-size', type=int, default=500, help='prescriptions per work unit (default: 500)')
+    verify.add_argument('--max-in-flight', type=int,
+                        help='chunks queued or running at once (default: twice the worker count)')
+    verify.add_argument('-q', '--quiet', action='store_true', help='do not print the summary')
+    verify.set_defaults(handler=verify_command)
+
+    from .bulk_reports import DEFAULT_CHUNK_SIZE
+
+    reports = commands.add_parser('reports', help='render PDF reports from JSONL analysis results')
+    reports.add_argument('inputs', nargs='*', help="JSONL results from 'verify' ('-' or none for stdin)")
+    reports.add_argument('-o', '--output', required=True,
+                         help='output directory, or a .zip archive to stream the reports into')
+    reports.add_argument('-w', '--workers', type=int,
+                         help='worker processes (default: CPU count; 0 runs in-process)')
+    reports.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                         help=f'reports per work unit (default: {DEFAULT_CHUNK_SIZE})')
+    reports.add_argument('--max-in-flight', type=int,
+                         help='chunks queued or running at once (default: twice the worker count)')
+    reports.add_argument('--failures', help='write failed report ids and errors to this JSONL file')
+    reports.add_argument('--progress-interval', type=float, default=5.0,
+                         help='seconds between progress lines (default: 5)')
+    reports.add_argument('-q', '--quiet', action='store_true', help='do not print progress or the summary')
+    reports.set_defaults(handler=reports_command)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Loading of source drug datasets (JSON or CSV)"""
+
+import csv
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+BUILTIN_SOURCE = os.path.join(os.path.dirname(__file__), 'data', 'drugs.json')
+
+DRUG_TEXT_FIELDS = ('generic_name', 'category', 'adult_dosage', 'max_daily', 'pediatric_dosage')
+DRUG_LIST_FIELDS = ('contraindications', 'side_effects', 'alternatives', 'interactions')
+# Numeric ages in years (None when unrestricted); a drug is appropriate for min_age <= age <= max_age
+DRUG_AGE_FIELDS = ('min_age', 'max_age')
+
+# Age restrictions written in older sources' pediatric dosage text
+_UNDER_AGE_RE = re.compile(r'not recommended (?:under|below) (\d+(?:\.\d+)?) ?(?:years?|yrs?)')
+
+# Separator for list fields in CSV sources, e.g. "liver disease;alcohol dependency"
+CSV_LIST_SEPARATOR = ';'
+
+
+class Dataset:
+    """Plain, mutable drug dataset as read from a source file"""
+
+    def __init__(self, version: str, drugs: Dict[str, Dict],
+                 interactions: Dict[Tuple[str, str], Dict], dosage_guidelines: Dict,
+                 aliases: Optional[Dict[str, str]] = None):
+        self.version = version
+        self.drugs = drugs
+        self.aliases = aliases or {}
+        self.dosage_guidelines = dosage_guidelines
+        # Interaction keys always use canonical names, whichever alias the source used
+        self.interactions = {}
+        for (drug1, drug2), info in interactions.items():
+            self.interactions[(self.canonical_name(drug1), self.canonical_name(drug2))] = info
+
+    def canonical_name(self, name: str) -> str:
+        name = normalize_name(name)
+        return self.aliases.get(name, name)
+
+    def checksum(self) -> str:
+        """SHA-256 over a canonical encoding of the dataset contents"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.drugs, sort_keys=True).encode('utf-8'))
+        digest.update(json.dumps(self.aliases, sort_keys=True).encode('utf-8'))
+        for (drug1, drug2), info in self.interactions.items():
+            digest.update(json.dumps([drug1, drug2, info], sort_keys=True).encode('utf-8'))
+        digest.update(json.dumps(self.dosage_guidelines, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+
+def normalize_name(name: str) -> str:
+    return ' '.join(name.lower().split())
+
+
+def _normalize_aliases(aliases: Dict[str, str], drugs: Dict[str, Dict]) -> Dict[str, str]:
+    normalized = {}
+    for alias, canonical in aliases.items():
+        alias = normalize_name(alias)
+        canonical = normalize_name(canonical)
+        if alias in drugs:
+            raise ValueError(f"alias {alias!r} is also a drug record name")
+        if alias != canonical:
+            normalized[alias] = canonical
+    return normalized
+
+
+def _age(value) -> Optional[float]:
+    if value in (None, ''):
+        return None
+    age = float(value)
+    return int(age) if age.is_integer() else age
+
+
+def drug_age_limits(record: Dict) -> Tuple[Optional[float], Optional[float]]:
+    """``(min_age, max_age)`` of a record, falling back to 'Not recommended under N years' text"""
+    min_age, max_age = (_age(record.get(field)) for field in DRUG_AGE_FIELDS)
+    if min_age is None and max_age is None:
+        match = _UNDER_AGE_RE.search(str(record.get('pediatric_dosage') or '').lower())
+        if match is not None:
+            min_age = _age(match.group(1))
+    return min_age, max_age
+
+
+def _normalize_drug(record: Dict) -> Dict:
+    drug = {field: str(record.get(field, '') or '') for field in DRUG_TEXT_FIELDS}
+    drug.update(zip(DRUG_AGE_FIELDS, drug_age_limits(record)))
+    for field in DRUG_LIST_FIELDS:
+        drug[field] = list(record.get(field) or [])
+    return drug
+
+
+def _interaction_entry(entry: Dict) -> Tuple[Tuple[str, str], Dict]:
+    key = (normalize_name(entry['drug1']), normalize_name(entry['drug2']))
+    return key, {'severity': entry['severity'].lower().strip(), 'description': entry['description']}
+
+
+def load_json(path: str) -> Dataset:
+    """Load a dataset from a JSON document with drugs, interactions and dosage_guidelines"""
+    with open(path, encoding='utf-8') as f:
+        document = json.load(f)
+    drugs = {normalize_name(name): _normalize_drug(record)
+             for name, record in document.get('drugs', {}).items()}
+    aliases = _normalize_aliases(document.get('aliases', {}), drugs)
+    interactions = dict(_interaction_entry(entry) for entry in document.get('interactions', []))
+    dosage_guidelines = document.get('dosage_guidelines') or load_builtin().dosage_guidelines
+    return Dataset(str(document.get('version', '')), drugs, interactions, dosage_guidelines, aliases)
+
+
+def _split_list(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or '').split(CSV_LIST_SEPARATOR) if item.strip()]
+
+
+def load_csv(drugs_path: str, interactions_path: Optional[str] = None, version: str = '') -> Dataset:
+    """Load a dataset from a drugs CSV and an optional interactions CSV.
+
+    The drugs file needs a ``name`` column plus the drug record fields and
+    an optional ``aliases`` column; list fields are ``;``-separated. The
+    interactions file has ``drug1``, ``drug2``, ``severity`` and
+    ``description`` columns. Dosage guidelines are taken from the bundled
+    dataset.
+    """
+    drugs = {}
+    aliases = {}
+    with open(drugs_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            record = {field: _split_list(row.get(field)) if field in DRUG_LIST_FIELDS else value
+                      for field, value in row.items()}
+            name = normalize_name(row['name'])
+            drugs[name] = _normalize_drug(record)
+            aliases.update((alias, name) for alias in _split_list(row.get('aliases')))
+
+    interactions = {}
+    if interactions_path:
+        with open(interactions_path, newline='', encoding='utf-8') as f:
+            interactions = dict(_interaction_entry(row) for row in csv.DictReader(f))
+
+    return Dataset(version, drugs, interactions, load_builtin().dosage_guidelines,
+                   _normalize_aliases(aliases, drugs))
+
+
+def load_source(path: str, interactions_path: Optional[str] = None) -> Dataset:
+    """Load a JSON dataset, or a CSV drugs file with an optional interactions CSV"""
+    if path.lower().endswith('.csv'):
+        return load_csv(path, interactions_path)
+    dataset = load_json(path)
+    if interactions_path:
+        with open(interactions_path, newline='', encoding='utf-8') as f:
+            for (drug1, drug2), info in map(_interaction_entry, csv.DictReader(f)):
+                dataset.interactions[(dataset.canonical_name(drug1), dataset.canonical_name(drug2))] = info
+    return dataset
+
+
+def load_builtin() -> Dataset:
+    """Load the dataset bundled with the package"""
+    return load_json(BUILTIN_SOURCE)
@@ -0,0 +1,229 @@
+"""Numeric dose and frequency parsing, and dose limits compiled from drug records"""
+
+import re
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Conversion of mass units to milligrams
+_MG_PER_UNIT = {'mg': 1.0, 'g': 1000.0, 'gm': 1000.0, 'mcg': 0.001, 'µg': 0.001, 'ug': 0.001}
+
+_NUMBER = r'\d+(?:\.\d+)?'
+
+_DOSE_RE = re.compile(rf'({_NUMBER})\s*(?:-\s*({_NUMBER})\s*)?(mg|g|gm|mcg|µg|ug|ml|iu|units?)\b')
+
+_INTERVAL_RE = re.compile(rf'(?:every|q)\s*({_NUMBER})\s*(?:-\s*({_NUMBER})\s*)?(?:hours?|hrs?|h)\b')
+
+_TIMES_RE = re.compile(r'\b(\d+|one|two|three|four|five|six)\s*(?:times|x)\s*(?:a\s+|per\s+)?(?:daily|day)\b')
+
+_PER_KG_RE = re.compile(rf'({_NUMBER})\s*(?:-\s*({_NUMBER})\s*)?mg\s*/\s*kg(\s*/\s*day)?')
+
+_WORD_NUMBERS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6}
+
+# Fixed schedules, as doses per day; checked in order, so plain "daily" comes last
+_SCHEDULES = (
+    (re.compile(r'\b(?:qid|qds)\b'), 4),
+    (re.compile(r'\bthrice\s*(?:a\s+|per\s+)?(?:daily|day)\b|\b(?:tid|tds)\b'), 3),
+    (re.compile(r'\btwice\s*(?:a\s+|per\s+)?(?:daily|day)\b|\b(?:bid|bd)\b'), 2),
+    (re.compile(r'\b(?:once|one time)\s*(?:a\s+|per\s+)?(?:daily|day)\b|\b(?:od|qd|qhs|hs|daily|at bedtime)\b'), 1),
+)
+
+
+class Dose(NamedTuple):
+    amount: float  # upper end of a written range, in milligrams for mass units
+    unit: str      # 'mg' for any mass unit, otherwise the unit as written (ml, units)
+
+    @property
+    def milligrams(self) -> Optional[float]:
+        return self.amount if self.unit == 'mg' else None
+
+
+class DoseLimits(NamedTuple):
+    """Adult limit compiled from a drug record; None where the record gives no number.
+
+    ``adult_dosage`` gives the usual range, which ordinary prescriptions
+    often exceed, so only ``max_daily`` is treated as a limit.
+    """
+    max_daily: Optional[float]  # mg per day, so also the most for a single dose
+
+
+class WeightLimits(NamedTuple):
+    """Per-kilogram limits compiled from a drug's pediatric dosage"""
+    max_dose_per_kg: float   # mg/kg per dose
+    max_daily_per_kg: float  # mg/kg per day, nan if the record gives no dosing interval
+
+
+@lru_cache(maxsize=4096)
+def parse_dose(text: str) -> Optional[Dose]:
+    """Parse a dose such as '500mg', '0.5 g' or '250-500mg' (taking the upper bound)"""
+    match = _DOSE_RE.search(str(text or '').lower())
+    if match is None:
+        return None
+    amount = float(match.group(2) or match.group(1))
+    unit = match.group(3)
+    if unit in _MG_PER_UNIT:
+        return Dose(amount * _MG_PER_UNIT[unit], 'mg')
+    return Dose(amount, 'units' if unit.startswith('unit') or unit == 'iu' else unit)
+
+
+def _dose_range(text: str) -> Tuple[Optional[float], Optional[float]]:
+    match = _DOSE_RE.search(text.lower())
+    if match is None or match.group(3) not in _MG_PER_UNIT:
+        return None, None
+    factor = _MG_PER_UNIT[match.group(3)]
+    low = float(match.group(1)) * factor
+    high = float(match.group(2)) * factor if match.group(2) else low
+    return low, high
+
+
+def _interval_range(text: str) -> Tuple[Optional[float], Optional[float]]:
+    """Hours between doses, shortest and longest"""
+    text = text.lower()
+    match = _INTERVAL_RE.search(text)
+    if match is not None:
+        low = float(match.group(1))
+        return low, float(match.group(2)) if match.group(2) else low
+    match = _TIMES_RE.search(text)
+    if match is not None:
+        times = _WORD_NUMBERS.get(match.group(1)) or int(match.group(1))
+        return (24.0 / times,) * 2 if times else (None, None)
+    for pattern, per_day in _SCHEDULES:
+        if pattern.search(text):
+            return (24.0 / per_day,) * 2
+    return None, None
+
+
+@lru_cache(maxsize=4096)
+def parse_frequency(text: str) -> Optional[float]:
+    """Most doses per day a frequency allows: 'bid' -> 2, 'every 4-6 hours' -> 6; None if open-ended"""
+    shortest, _ = _interval_range(str(text or ''))
+    return 24.0 / shortest if shortest else None
+
+
+def compile_limits(record: Dict) -> DoseLimits:
+    """Turn a drug record's dosage strings into numeric limits"""
+    _, max_daily = _dose_range(record.get('max_daily', ''))
+    return DoseLimits(max_daily)
+
+
+def compile_weight_rule(record: Dict) -> Optional[WeightLimits]:
+    """Per-kg limits from e.g. '10-15mg/kg every 4-6 hours' or '25-45mg/kg/day divided every 12 hours'"""
+    text = record.get('pediatric_dosage', '').lower()
+    match = _PER_KG_RE.search(text)
+    if match is None:
+        return None
+    high = float(match.group(2) or match.group(1))
+    shortest, _ = _interval_range(text)
+    if match.group(3):
+        # A daily amount divided into doses
+        return WeightLimits(high * shortest / 24.0 if shortest else high, high)
+    return WeightLimits(high, high * 24.0 / shortest if shortest else float('nan'))
+
+
+class DrugDoseRules:
+    """Adult and per-kg limits of each drug, compiled from its record on first lookup.
+
+    The one source of dose limits: single analyses only touch the drugs
+    they name, so nothing is compiled up front, and ``WeightDosingTable``
+    reads every drug through it for batch checks.
+    """
+
+    def __init__(self, knowledge_base):
+        self._drug_database = knowledge_base.drug_database
+        self._rules: Dict[str, Tuple[DoseLimits, Optional[WeightLimits]]] = {}
+
+    def get(self, drug_name: str) -> Optional[Tuple[DoseLimits, Optional[WeightLimits]]]:
+        """``(limits, weight limits or None)`` for a record name, None for unknown drugs"""
+        rules = self._rules.get(drug_name)
+        if rules is None and drug_name in self._drug_database:
+            record = self._drug_database[drug_name]
+            rules = self._rules[drug_name] = (compile_limits(record), compile_weight_rule(record))
+        return rules
+
+
+def exceeds_limits(limits: DoseLimits, dose: Optional[Dose], doses_per_day: Optional[float]) -> Optional[str]:
+    """Describe how a dose breaks the limits, or None if it does not (or cannot be checked)"""
+    milligrams = dose.milligrams if dose is not None else None
+    if milligrams is None or limits.max_daily is None:
+        return None
+    if milligrams > limits.max_daily:
+        return f"{milligrams:g}mg per dose is above the {limits.max_daily:g}mg daily maximum"
+    if doses_per_day is not None and milligrams * doses_per_day > limits.max_daily:
+        return f"{milligrams * doses_per_day:g}mg per day is above the {limits.max_daily:g}mg daily maximum"
+    return None
+
+
+def exceeds_weight_limits(limits: WeightLimits, weight: float, dose: Optional[Dose],
+                          doses_per_day: Optional[float]) -> Optional[str]:
+    """Describe how a dose breaks per-kg limits for a patient weight, or None"""
+    milligrams = dose.milligrams if dose is not None else None
+    if milligrams is None or not weight or weight <= 0:
+        return None
+    per_kg = milligrams / weight
+    if per_kg > limits.max_dose_per_kg:
+        return f"{per_kg:.1f}mg/kg per dose is above the {limits.max_dose_per_kg:g}mg/kg maximum"
+    if doses_per_day is not None and per_kg * doses_per_day > limits.max_daily_per_kg:
+        return f"{per_kg * doses_per_day:.1f}mg/kg per day is above the {limits.max_daily_per_kg:g}mg/kg daily maximum"
+    return None
+
+
+class WeightDosingTable:
+    """Per-kg limits as NumPy arrays, for checking many dispensing rows at once.
+
+    Drugs are numbered in ``drug_ids``; drugs without a per-kg rule have NaN
+    limits, and NaN comparisons are false, so they always pass.
+    """
+
+    def __init__(self, knowledge_base):
+        import numpy as np
+
+        rules = knowledge_base.derived('dose_rules', DrugDoseRules)
+        self.drug_ids: Dict[str, int] = {name: i for i, name in enumerate(knowledge_base.drug_database)}
+        size = len(self.drug_ids)
+        # One extra NaN slot at the end for unknown drugs (id -1)
+        self.max_dose_per_kg = np.full(size + 1, np.nan)
+        self.max_daily_per_kg = np.full(size + 1, np.nan)
+        for name, drug_id in self.drug_ids.items():
+            _, rule = rules.get(name)
+            if rule is not None:
+                self.max_dose_per_kg[drug_id] = rule.max_dose_per_kg
+                self.max_daily_per_kg[drug_id] = rule.max_daily_per_kg
+
+    def check(self, drug_ids, weights, doses_mg, doses_per_day):
+        """Boolean array, True where a row is within its drug's per-kg limits.
+
+        ``drug_ids`` uses -1 for unknown drugs; unknown doses, frequencies or
+        weights are NaN (or non-positive weights) and are not flagged.
+        """
+        import numpy as np
+
+        drug_ids = np.asarray(drug_ids, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per_kg = np.where(weights > 0, np.asarray(doses_mg, dtype=np.float64) / weights, np.nan)
+            over = per_kg > self.max_dose_per_kg[drug_ids]
+            over |= per_kg * np.asarray(doses_per_day, dtype=np.float64) > self.max_daily_per_kg[drug_ids]
+        return ~over
+
+    def encode(self, drug_names, dosages, frequencies):
+        """Map names and dose/frequency strings to arrays, parsing each distinct string once"""
+        import numpy as np
+
+        def codes(values, convert):
+            cache = {}
+            out = np.empty(len(values), dtype=np.float64)
+            for i, value in enumerate(values):
+                converted = cache.get(value)
+                if converted is None:
+                    converted = cache[value] = convert(value)
+                out[i] = converted
+            return out
+
+        def milligrams(text):
+            dose = parse_dose(text)
+            return dose.milligrams if dose is not None and dose.milligrams is not None else np.nan
+
+        drug_ids = np.fromiter((self.drug_ids.get(name, -1) for name in drug_names), dtype=np.int64,
+                               count=len(drug_names))
+        doses = codes(dosages, milligrams)
+        per_day = codes(frequencies, lambda text: parse_frequency(text) or np.nan)
+        return drug_ids, doses, per_day
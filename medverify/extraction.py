@@ -0,0 +1,371 @@
+"""Medication extraction from free-text prescriptions"""
+
+import io
+import json
+import re
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .automaton import select_mentions
+
+# Words that can precede a dose without being a drug name
+_NOT_DRUG_NAMES = frozenset((
+    'take', 'takes', 'taking', 'give', 'given', 'and', 'or', 'with', 'of', 'then', 'plus', 'to', 'x',
+    'dose', 'tab', 'tabs', 'tablet', 'tablets', 'cap', 'caps', 'capsule', 'capsules',
+    'inj', 'injection', 'syrup', 'solution', 'suspension', 'mg', 'ml',
+))
+
+_FORMS = ('tablets', 'tablet', 'tabs', 'tab', 'capsules', 'capsule', 'caps', 'cap', 'syrup',
+          'suspension', 'susp', 'solution', 'injection', 'inj')
+
+_FORM = f"(?:{'|'.join(_FORMS)})"
+
+_ROUTE = r'''
+    (?P<route>po|p\.o\.|oral(?:ly)?|by\s+mouth|iv|i\.v\.|intravenous(?:ly)?|im|i\.m\.|intramuscular(?:ly)?
+        |sc|s\.c\.|subcut(?:aneous(?:ly)?)?|sl|sublingual(?:ly)?|topical(?:ly)?|inhaled|pr|rectal(?:ly)?)
+'''
+
+_FREQUENCY = r'''
+    (?P<frequency>
+        (?:every|q)\s*(?P<hours>\d+)\s*(?:-\s*\d+\s*)?(?:hours?|hrs?|h)
+      | (?P<times>\d+|two|three|four|five|six)\s*(?:times|x)\s*(?:a\s+|per\s+)?(?:daily|day)
+      | (?P<words>once|twice|thrice)\s*(?:a\s+|per\s+)?(?:daily|day)
+      | (?P<abbreviation>od|qd|bid|bd|tid|tds|qid|qds|qhs|hs|prn|stat)
+      | daily|per\s+day|a\s+day
+      | as\s+needed
+      | at\s+bedtime
+    )
+'''
+
+# The scan looks for dose tokens; the drug name is read just before each one and
+# the dosage form, route and frequency just after it
+_DOSE_RE = re.compile(r'(?P<strength>\d+(?:\.\d+)?)\s*(?P<unit>mg|mcg|µg|g|ml|iu|units?)\b', re.IGNORECASE)
+
+# Matched against the reversed text before a dose: whitespace, an optional
+# dosage form, then the drug name, so no forward search over the window is needed
+_REVERSED_NAME_RE = re.compile(
+    rf"\s+(?:(?:{'|'.join(form[::-1] for form in _FORMS)})\s+)?(?P<name>[a-z\-]*[a-z])(?![\w\-])",
+    re.IGNORECASE)
+
+_TAIL_RE = re.compile(rf'''
+    (?:\s*{_FORM}\b)?
+    (?:[\s,]+{_ROUTE}(?![a-z]))?
+    (?:[\s,]+{_FREQUENCY}\b)?
+''', re.VERBOSE | re.IGNORECASE)
+
+# Dose right after a known drug name, e.g. "Warfarin: 5 mg" or "Amoxicillin capsules 500mg"
+_DOSE_AFTER_NAME_RE = re.compile(
+    rf'[\s,:\-]*(?:{_FORM}\s+)?(?P<strength>\d+(?:\.\d+)?)\s*(?P<unit>mg|mcg|µg|g|ml|iu|units?)\b',
+    re.IGNORECASE)
+
+# Characters before a dose searched for its drug name
+_NAME_WINDOW = 64
+
+# Streaming: characters read per chunk, and characters re-scanned across each chunk
+# boundary, which must exceed the longest mention (name, dose, form, route and frequency)
+STREAM_CHUNK_SIZE = 1 << 20
+STREAM_OVERLAP = 4096
+
+# Room after a name for its dose, form, route and frequency written with single
+# spaces (about 80 characters at most, e.g. "suspension 12.5 units, intramuscularly,
+# three times per day"), with some to spare for longer whitespace runs
+_MENTION_TAIL = 128
+
+_UNITS = {'µg': 'mcg', 'iu': 'units', 'unit': 'units'}
+
+_ROUTES = {'po': 'oral', 'p.o.': 'oral', 'orally': 'oral', 'by mouth': 'oral',
+           'iv': 'intravenous', 'i.v.': 'intravenous', 'intravenously': 'intravenous',
+           'im': 'intramuscular', 'i.m.': 'intramuscular', 'intramuscularly': 'intramuscular',
+           'sc': 'subcutaneous', 's.c.': 'subcutaneous', 'subcut': 'subcutaneous',
+           'subcutaneously': 'subcutaneous', 'sl': 'sublingual', 'sublingually': 'sublingual',
+           'topically': 'topical', 'pr': 'rectal', 'rectally': 'rectal'}
+
+_FREQUENCY_WORDS = {'once': 'once daily', 'twice': 'twice daily', 'thrice': 'three times daily'}
+
+_FREQUENCY_ABBREVIATIONS = {'od': 'once daily', 'qd': 'once daily', 'bid': 'twice daily', 'bd': 'twice daily',
+                            'tid': 'three times daily', 'tds': 'three times daily',
+                            'qid': 'four times daily', 'qds': 'four times daily',
+                            'qhs': 'at bedtime', 'hs': 'at bedtime', 'prn': 'as needed', 'stat': 'once'}
+
+
+def _frequency(match) -> str:
+    """Normalized frequency text for a match, 'as prescribed' if none was given"""
+    if match.group('frequency') is None:
+        return 'as prescribed'
+    if match.group('hours'):
+        return f"every {match.group('hours')} hours"
+    if match.group('times'):
+        return f"{match.group('times').lower()} times daily"
+    if match.group('words'):
+        return _FREQUENCY_WORDS[match.group('words').lower()]
+    if match.group('abbreviation'):
+        return _FREQUENCY_ABBREVIATIONS[match.group('abbreviation').lower()]
+    frequency = ' '.join(match.group('frequency').lower().split())
+    return 'once daily' if frequency in ('daily', 'per day', 'a day') else frequency
+
+
+def _route(match) -> Optional[str]:
+    route = match.group('route')
+    if route is None:
+        return None
+    route = ' '.join(route.lower().split())
+    return _ROUTES.get(route, route)
+
+
+def _iter_dosed_mentions(text: str) -> Iterator[Dict]:
+    """Medications found from their doses.
+
+    One pass over the text finds dose tokens; the drug name is read
+    backwards from each dose and the form, route and frequency are matched
+    right after it, so the cost is linear in the text length.
+    """
+    last_end = 0
+    for dose in _DOSE_RE.finditer(text):
+        dose_start = dose.start()
+        window_start = max(last_end, dose_start - _NAME_WINDOW)
+        name_match = _REVERSED_NAME_RE.match(text[window_start:dose_start][::-1])
+        if name_match is None:
+            continue
+        name_start = dose_start - name_match.end('name')
+        if name_start == window_start and name_start > 0 and (text[name_start - 1].isalnum()
+                                                              or text[name_start - 1] in '-_'):
+            continue  # the window cut through a word
+        name = name_match.group('name')[::-1].lower()
+        if name in _NOT_DRUG_NAMES:
+            continue
+        tail = _TAIL_RE.match(text, dose.end())
+        last_end = tail.end()
+
+        yield _medication(name, dose, tail, name_start)
+
+
+def _iter_known_mentions(text: str, automaton) -> Iterator[Dict]:
+    """Medications found as known drug names, with the dose and frequency that follow them"""
+    for mention in select_mentions(automaton.iter_mentions(text)):
+        dose = _DOSE_AFTER_NAME_RE.match(text, mention.end)
+        tail = _TAIL_RE.match(text, dose.end() if dose else mention.end)
+        yield _medication(' '.join(text[mention.start:mention.end].split()), dose, tail, mention.start)
+
+
+def _medication(name: str, dose, tail, start: int) -> Dict:
+    if dose is None:
+        strength = unit = None
+        dosage = ''
+    else:
+        unit = dose.group('unit').lower()
+        unit = _UNITS.get(unit, unit)
+        strength = float(dose.group('strength'))
+        dosage = f"{dose.group('strength')}{unit}"
+    return {
+        'name': name.capitalize(),
+        'dosage': dosage,
+        'frequency': _frequency(tail),
+        'strength': strength,
+        'unit': unit,
+        'route': _route(tail),
+        'span': (start, tail.end()),
+    }
+
+
+def iter_medications(text: str, automaton=None) -> Iterator[Dict]:
+    """Yield medications found in ``text`` in order of appearance.
+
+    Without an ``automaton`` a medication is a word followed by a dose.
+    With one (see ``KnowledgeBase.name_automaton``), every known drug name
+    or alias is found in the same linear pass, including multi-word names
+    and mentions without a dose; dose-led matches for other names are
+    kept where they do not overlap a known one. Matches never overlap, and
+    each result carries its ``(start, end)`` character span in ``text``.
+    """
+    dosed = _iter_dosed_mentions(text)
+    if automaton is None:
+        yield from dosed
+        return
+
+    known = _iter_known_mentions(text, automaton)
+    pending = next(known, None)
+    for medication in dosed:
+        start, end = medication['span']
+        while pending is not None and pending['span'][1] <= start:
+            yield pending
+            pending = next(known, None)
+        if pending is not None and pending['span'][0] < end:
+            continue  # the known name wins the overlapping span
+        yield medication
+    while pending is not None:
+        yield pending
+        pending = next(known, None)
+
+
+def extract_medications_from_text(text: str, knowledge_base=None) -> List[Dict]:
+    """Extract medication information from text using NLP patterns"""
+    automaton = knowledge_base.name_automaton() if knowledge_base is not None else None
+    return list(iter_medications(text, automaton))
+
+
+def _iter_chunks(source, chunk_size: int) -> Iterator[str]:
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        yield from source
+
+
+def stream_medications(source, document_id=None, automaton=None, chunk_size: int = STREAM_CHUNK_SIZE,
+                       overlap: int = STREAM_OVERLAP) -> Iterator[Dict]:
+    """Extract medications from a document read in chunks.
+
+    ``source`` is a string, a text file object or an iterable of text
+    chunks. Each chunk is scanned together with the last ``overlap``
+    characters before it, so mentions that straddle a chunk boundary are
+    found once and in full. Memory use depends on ``chunk_size`` and
+    ``overlap``, not on the document length. Results are those of
+    ``iter_medications`` with ``span`` as offsets into the whole document
+    and a ``document_id`` key.
+
+    Raises ``ValueError`` if ``overlap`` is shorter than the longest
+    mention the patterns (and the automaton's names) can produce, or not
+    shorter than ``chunk_size``.
+    """
+    longest = _longest_mention(automaton)
+    if overlap < longest:
+        raise ValueError(f"overlap must be at least {longest} characters, the longest mention, not {overlap}")
+    if overlap >= chunk_size:
+        raise ValueError(f"overlap ({overlap}) must be smaller than chunk_size ({chunk_size})")
+    return _stream_medications(source, document_id, automaton, chunk_size, overlap)
+
+
+def _longest_mention(automaton=None) -> int:
+    """Characters the longest mention can span: its name, then dose, form, route and frequency"""
+    return max(_NAME_WINDOW, automaton.longest if automaton is not None else 0) + _MENTION_TAIL
+
+
+def _stream_medications(source, document_id, automaton, chunk_size: int, overlap: int) -> Iterator[Dict]:
+    chunks = _iter_chunks(source, chunk_size)
+    buffer = ''
+    base = 0       # document offset of buffer[0]
+    resume = 0     # document offset before which every mention has been handled
+    pending = next(chunks, None)
+    while pending is not None:
+        buffer += pending
+        pending = next(chunks, None)
+        final = pending is None
+        if not final and len(buffer) < 2 * overlap:
+            continue
+        limit = len(buffer) if final else len(buffer) - overlap
+        for medication in iter_medications(buffer, automaton):
+            start, end = medication['span']
+            if start >= limit:
+                break
+            if base + start < resume:
+                continue
+            medication['span'] = (base + start, base + end)
+            medication['document_id'] = document_id
+            resume = base + end
+            yield medication
+        resume = max(resume, base + limit)
+        # Keep enough text before the limit to read names and check word boundaries
+        cut = max(0, limit - _NAME_WINDOW - 1)
+        base += cut
+        buffer = buffer[cut:]
+
+
+def stream_documents(documents: Iterable[Tuple[object, object]], automaton=None, **kwargs) -> Iterator[Dict]:
+    """``stream_medications`` over ``(document_id, source)`` pairs, one document at a time"""
+    for document_id, source in documents:
+        yield from stream_medications(source, document_id, automaton, **kwargs)
+
+
+def open_documents(path: str) -> Iterator[Tuple[str, object]]:
+    """Yield ``(document_id, source)`` pairs from a file.
+
+    A ``.zip`` archive yields one document per member, read lazily; a
+    ``.jsonl`` file one per line with ``id`` and ``text`` fields; any other
+    file (or ``-`` for stdin) is a single document.
+    """
+    if path == '-':
+        yield '-', sys.stdin
+    elif path.lower().endswith('.zip'):
+        import zipfile
+
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+                with archive.open(member) as raw:
+                    yield member.filename, io.TextIOWrapper(raw, encoding='utf-8', errors='replace')
+    elif path.lower().endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    document = json.loads(line)
+                    yield document.get('id', f'{path}:{line_number}'), document.get('text', '')
+    else:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            yield path, f
+
+
+def benchmark(text: str, repeat: int = 5, automaton=None) -> float:
+    """Best-of-``repeat`` extraction throughput over ``text`` in MB/s"""
+    size = len(text.encode('utf-8'))
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in iter_medications(text, automaton):
+            pass
+        best = min(best, time.perf_counter() - started)
+    return size / best / 1e6 if best else float('inf')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m medverify.extraction',
+                                     description='Extract medications from prescription text')
+    parser.add_argument('paths', nargs='*', default=['-'],
+                        help="text, .jsonl or .zip files ('-' for stdin); output is JSON lines")
+    parser.add_argument('--dictionary', action='store_true',
+                        help='also find known drug names and aliases from the knowledge base')
+    parser.add_argument('--benchmark', action='store_true', help='report extraction throughput instead')
+    parser.add_argument('--repeat', type=int, default=5, help='benchmark repetitions (default: 5)')
+    parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_SIZE,
+                        help=f'characters read at a time (default: {STREAM_CHUNK_SIZE})')
+    args = parser.parse_args(argv)
+
+    automaton = None
+    if args.dictionary:
+        from .knowledge_base import get_knowledge_base
+        automaton = get_knowledge_base().name_automaton()
+
+    # Small chunks re-scan half of each chunk rather than the default overlap
+    overlap = min(STREAM_OVERLAP, args.chunk_size // 2)
+    if overlap < _longest_mention(automaton):
+        parser.error(f'--chunk-size must be at least {2 * _longest_mention(automaton)} characters')
+
+    if args.benchmark:
+        for path in args.paths:
+            if path == '-':
+                text = sys.stdin.read()
+            else:
+                with open(path, encoding='utf-8') as f:
+                    text = f.read()
+            count = sum(1 for _ in iter_medications(text, automaton))
+            throughput = benchmark(text, args.repeat, automaton)
+            print(f"{path}: {len(text.encode('utf-8')) / 1e6:.2f} MB, {count} medications: {throughput:.1f} MB/s")
+        return 0
+
+    documents = (document for path in args.paths for document in open_documents(path))
+    for medication in stream_documents(documents, automaton, chunk_size=args.chunk_size, overlap=overlap):
+        print(json.dumps(medication))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
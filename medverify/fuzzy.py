@@ -0,0 +1,168 @@
+"""Approximate drug-name matching for misspelled and OCR-noisy input"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .dataset import normalize_name
+
+# Matches below this confidence are only offered as suggestions, never auto-resolved
+AUTO_RESOLVE_CONFIDENCE = 0.8
+
+
+class FuzzyMatch(NamedTuple):
+    name: str          # indexed name that matched (drug name or alias)
+    target: str        # canonical name it resolves to
+    distance: int      # Levenshtein distance to the query
+    confidence: float  # 1.0 for an exact match, falling with distance
+
+
+def _trigrams(name: str) -> List[str]:
+    padded = f'  {name} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _char_masks(pattern: str) -> Dict[str, int]:
+    """Bit mask of the positions of each character in ``pattern``"""
+    masks: Dict[str, int] = {}
+    for position, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks
+
+
+def _bit_parallel_levenshtein(masks: Dict[str, int], length: int, text: str) -> int:
+    """Edit distance between a pattern (given by ``_char_masks`` and its length) and ``text``.
+
+    Myers' bit-vector algorithm: a whole column of the distance matrix is
+    updated with a few integer operations per character of ``text``.
+    """
+    if not length:
+        return len(text)
+    full = (1 << length) - 1
+    high = 1 << (length - 1)
+    positive, negative, score = full, 0, length
+    for char in text:
+        equal = masks.get(char, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        horizontal_positive = negative | ~(horizontal | positive)
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & high:
+            score += 1
+        elif horizontal_negative & high:
+            score -= 1
+        horizontal_positive = (horizontal_positive << 1) | 1
+        horizontal_negative <<= 1
+        positive = (horizontal_negative | ~(vertical | horizontal_positive)) & full
+        negative = horizontal_positive & vertical
+    return score
+
+
+class FuzzyMatcher:
+    """Trigram inverted index over drug names with edit-distance verification.
+
+    Each indexed name is split into padded character trigrams. Names are
+    numbered by length, so the names within a query's edit budget of its
+    length form one id range, and each trigram's posting list is a sorted
+    NumPy array that is sliced to that range. Shared trigrams are counted
+    with one ``bincount`` over the slices, which stays fast when names are
+    similar and common trigrams have long posting lists. Names sharing
+    enough trigrams to be within the budget (one edit removes at most three
+    trigrams) are ranked by that count, and the best are verified with a
+    bit-parallel Levenshtein distance.
+    """
+
+    def __init__(self, names: Iterable[Tuple[str, str]], max_candidates: int = 32):
+        import numpy as np
+
+        self.max_candidates = max_candidates
+        first_target: Dict[str, str] = {}
+        for name, target in names:
+            name = normalize_name(name)
+            if name and name not in first_target:
+                first_target[name] = target
+        # Numbered by length (stable), so every length window is a contiguous id range
+        self.names: List[str] = sorted(first_target, key=len)
+        self.targets: List[str] = [first_target[name] for name in self.names]
+        self.exact: Dict[str, int] = {name: name_id for name_id, name in enumerate(self.names)}
+        self._length_starts = [0]
+        for name_id, name in enumerate(self.names):
+            while len(self._length_starts) <= len(name):
+                self._length_starts.append(name_id)
+        self._length_starts.append(len(self.names))
+
+        postings: Dict[str, List[int]] = {}
+        for name_id, name in enumerate(self.names):
+            for gram in set(_trigrams(name)):
+                postings.setdefault(gram, []).append(name_id)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _id_range(self, min_length: int, max_length: int) -> Tuple[int, int]:
+        """Ids of the names whose length is within ``[min_length, max_length]``"""
+        starts = self._length_starts
+        low = starts[min(max(min_length, 0), len(starts) - 1)]
+        high = starts[min(max(max_length + 1, 0), len(starts) - 1)]
+        return low, high
+
+    @staticmethod
+    def max_distance(query: str) -> int:
+        """Edit budget for a query: about one typo per four characters, at most three"""
+        return min(3, max(1, len(query) // 4))
+
+    def match(self, query: str, limit: int = 5) -> List[FuzzyMatch]:
+        """Return up to ``limit`` candidates for ``query``, best first"""
+        query = normalize_name(query)
+        if not query:
+            return []
+        name_id = self.exact.get(query)
+        if name_id is not None:
+            return [FuzzyMatch(query, self.targets[name_id], 0, 1.0)]
+
+        import numpy as np
+
+        max_distance = self.max_distance(query)
+        grams = set(_trigrams(query))
+        low, high = self._id_range(len(query) - max_distance, len(query) + max_distance)
+        slices = []
+        for gram in grams:
+            postings = self.postings.get(gram)
+            if postings is not None:
+                start, end = np.searchsorted(postings, (low, high))
+                if start < end:
+                    slices.append(postings[start:end])
+        if not slices:
+            return []
+        counts = np.bincount(np.concatenate(slices) - low, minlength=high - low)
+        min_shared = len(grams) - 3 * max_distance
+        candidates = np.flatnonzero(counts >= max(min_shared, 1))
+        if len(candidates) > self.max_candidates:
+            # Most shared trigrams first; ties go to the lower id
+            order = np.lexsort((candidates, -counts[candidates]))
+            candidates = candidates[order[:self.max_candidates]]
+
+        masks = _char_masks(query)
+        best_by_target: Dict[str, FuzzyMatch] = {}
+        for name_id in (candidates + low).tolist():
+            name = self.names[name_id]
+            if abs(len(name) - len(query)) > max_distance:
+                continue
+            distance = _bit_parallel_levenshtein(masks, len(query), name)
+            if distance > max_distance:
+                continue
+            confidence = 1.0 - distance / max(len(query), len(name))
+            match = FuzzyMatch(name, self.targets[name_id], distance, round(confidence, 3))
+            current = best_by_target.get(match.target)
+            if current is None or match.confidence > current.confidence:
+                best_by_target[match.target] = match
+        matches = sorted(best_by_target.values(), key=lambda m: (-m.confidence, m.distance, m.name))
+        return matches[:limit]
+
+    def best(self, query: str, min_confidence: float = AUTO_RESOLVE_CONFIDENCE) -> Optional[FuzzyMatch]:
+        """Return the single best match if it is confident and unambiguous"""
+        matches = self.match(query, limit=2)
+        if not matches or matches[0].confidence < min_confidence:
+            return None
+        if len(matches) > 1 and matches[1].confidence == matches[0].confidence:
+            return None
+        return matches[0]
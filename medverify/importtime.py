@@ -0,0 +1,114 @@
+"""Startup import-time report, from ``python -X importtime``.
+
+Runs a module import or a script in a fresh interpreter and summarises which
+top-level packages it loaded and how long each took::
+
+    python -m medverify.importtime app.py --top 15
+    python -m medverify.importtime app.py --forbid plotly.express reportlab
+
+``--forbid`` exits with status 1 if any of the named modules (or their
+submodules) was imported, whether by the target or by its dependencies,
+so a check can keep heavy dependencies off the startup path.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+_PREFIX = 'import time:'
+
+
+class ImportTiming(NamedTuple):
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int   # 0 for imports made directly by the target
+
+
+def parse_importtime(lines: Iterable[str]) -> List[ImportTiming]:
+    """Timings from ``-X importtime`` stderr; other lines (warnings, the header) are skipped"""
+    timings = []
+    for line in lines:
+        if not line.startswith(_PREFIX):
+            continue
+        fields = line[len(_PREFIX):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        indent = len(name) - len(name.lstrip())
+        timings.append(ImportTiming(name.strip(), int(fields[0]), int(fields[1]), (indent - 1) // 2))
+    return timings
+
+
+def measure(target: str, python: Optional[str] = None) -> List[ImportTiming]:
+    """Import timings of a script (a ``.py`` path) or a module, in a fresh interpreter"""
+    command = [python or sys.executable, '-X', 'importtime']
+    if target.endswith('.py'):
+        command.append(target)
+    else:
+        command += ['-c', f'import {target}']
+    env = dict(os.environ)
+    # Keep the current directory importable, as it is for ``python -m``
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+    completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               text=True, env=env)
+    if completed.returncode:
+        raise RuntimeError(f"{' '.join(command)} exited with status {completed.returncode}:\n"
+                           f"{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr.splitlines())
+
+
+def by_package(timings: Iterable[ImportTiming]) -> Dict[str, int]:
+    """Cumulative microseconds per top-level package imported directly by the target"""
+    totals: Dict[str, int] = {}
+    for timing in timings:
+        if timing.depth == 0:
+            package = timing.name.split('.')[0]
+            totals[package] = totals.get(package, 0) + timing.cumulative_us
+    return totals
+
+
+def report(timings: List[ImportTiming], top: int = 15) -> str:
+    totals = by_package(timings)
+    total = sum(totals.values())
+    lines = [f"{'package':<28} {'ms':>9} {'share':>7}"]
+    for package, micros in sorted(totals.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"{package:<28} {micros / 1000:>9.1f} {micros / max(total, 1):>7.1%}")
+    lines.append(f"{'total':<28} {total / 1000:>9.1f}   ({len(timings)} modules)")
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m medverify.importtime',
+                                     description='Report import time by top-level package')
+    parser.add_argument('target', nargs='?', default='medverify',
+                        help='script path (ending in .py) or module name (default: medverify)')
+    parser.add_argument('--top', type=int, default=15, help='packages to list (default: 15)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs; each package keeps its fastest time (default: 3)')
+    parser.add_argument('--forbid', nargs='+', default=[], metavar='MODULE',
+                        help='fail if any of these modules or their submodules is imported')
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.target) for _ in range(max(1, args.repeat))]
+    fastest: Dict[str, ImportTiming] = {}
+    for timings in runs:
+        for timing in timings:
+            best = fastest.get(timing.name)
+            if best is None or timing.cumulative_us < best.cumulative_us:
+                fastest[timing.name] = timing
+    print(report(list(fastest.values()), args.top))
+
+    imported = {timing.name for timing in runs[0]}
+    forbidden = [module for module in args.forbid
+                 if any(name == module or name.startswith(module + '.') for name in imported)]
+    if forbidden:
+        print(f"error: imported at startup: {', '.join(forbidden)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Indexed drug-drug interaction lookup"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .dataset import normalize_name
+
+
+class InteractionIndex:
+    """Interaction table keyed by canonical integer drug-id pairs.
+
+    Built once from an ``{(drug_a, drug_b): info}`` mapping. Every drug name
+    gets an integer id, each pair is stored under ``(min_id, max_id)`` so the
+    order of the source key no longer matters, and each drug keeps the set of
+    ids it interacts with. Checking a regimen then only touches the
+    neighbours that are actually present instead of every medication pair.
+    """
+
+    def __init__(self, interaction_database: Dict[Tuple[str, str], Dict]):
+        self.drug_ids: Dict[str, int] = {}
+        self.drug_names: List[str] = []
+        self.pairs: Dict[Tuple[int, int], Dict] = {}
+        self.adjacency: List[Set[int]] = []
+
+        for (drug1, drug2), info in interaction_database.items():
+            id1 = self._intern(drug1)
+            id2 = self._intern(drug2)
+            self.pairs[self.pair_key(id1, id2)] = info
+            self.adjacency[id1].add(id2)
+            self.adjacency[id2].add(id1)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def _intern(self, name: str) -> int:
+        name = self.normalize(name)
+        drug_id = self.drug_ids.get(name)
+        if drug_id is None:
+            drug_id = len(self.drug_names)
+            self.drug_ids[name] = drug_id
+            self.drug_names.append(name)
+            self.adjacency.append(set())
+        return drug_id
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        return normalize_name(name)
+
+    @staticmethod
+    def pair_key(id1: int, id2: int) -> Tuple[int, int]:
+        return (id1, id2) if id1 <= id2 else (id2, id1)
+
+    def drug_id(self, name: str) -> Optional[int]:
+        """Return the id of a drug name, or None if it has no interactions"""
+        return self.drug_ids.get(self.normalize(name))
+
+    def lookup(self, drug1: str, drug2: str) -> Optional[Dict]:
+        """Return interaction info for two drug names in either order"""
+        id1 = self.drug_id(drug1)
+        id2 = self.drug_id(drug2)
+        if id1 is None or id2 is None:
+            return None
+        return self.pair_info(id1, id2)
+
+    def pair_info(self, id1: int, id2: int) -> Optional[Dict]:
+        """Return interaction info for two drug ids in either order"""
+        return self.pairs.get(self.pair_key(id1, id2))
+
+    def iter_pairs(self) -> Iterable[Tuple[int, int, Dict]]:
+        """Yield ``(id1, id2, info)`` for every stored pair"""
+        for (id1, id2), info in self.pairs.items():
+            yield id1, id2, info
+
+    def severity_columns(self):
+        """Every pair as NumPy arrays ``(id1, id2, codes, levels)``; codes index the sorted severity levels"""
+        import numpy as np
+
+        pairs = list(self.iter_pairs())
+        levels = sorted({info['severity'] for _, _, info in pairs})
+        level_codes = {level: code for code, level in enumerate(levels)}
+        id1 = np.fromiter((pair[0] for pair in pairs), dtype=np.int64, count=len(pairs))
+        id2 = np.fromiter((pair[1] for pair in pairs), dtype=np.int64, count=len(pairs))
+        codes = np.fromiter((level_codes[pair[2]['severity']] for pair in pairs), dtype=np.int64, count=len(pairs))
+        return id1, id2, codes, levels
+
+    def _partners(self, drug_id: int, present: Dict[int, List[int]]) -> List[int]:
+        """Ids in ``present`` that interact with ``drug_id``"""
+        neighbours = self.adjacency[drug_id]
+        if len(neighbours) > len(present):
+            return [other for other in present if other in neighbours]
+        return [other for other in neighbours if other in present]
+
+    def find_pairs(self, drug_ids: Iterable[Optional[int]]) -> List[Tuple[int, int, Dict]]:
+        """Find interacting positions in a regimen of drug ids.
+
+        Returns ``(i, j, info)`` triples with ``i < j`` in regimen order.
+        ``None`` entries (drugs without known interactions) are skipped.
+        """
+        positions: Dict[int, List[int]] = {}
+        for position, drug_id in enumerate(drug_ids):
+            if drug_id is not None:
+                positions.setdefault(drug_id, []).append(position)
+
+        hits = []
+        for drug_id, drug_positions in positions.items():
+            for other in self._partners(drug_id, positions):
+                if other < drug_id:
+                    continue
+                info = self.pair_info(drug_id, other)
+                if other == drug_id:
+                    hits.extend((i, j, info)
+                                for n, i in enumerate(drug_positions)
+                                for j in drug_positions[n + 1:])
+                    continue
+                for i in drug_positions:
+                    for j in positions[other]:
+                        hits.append((min(i, j), max(i, j), info))
+
+        hits.sort(key=lambda hit: (hit[0], hit[1]))
+        return hits
@@ -0,0 +1,182 @@
+"""Process-wide, read-only drug knowledge base"""
+
+import os
+import threading
+from types import MappingProxyType
+from typing import Dict, Optional
+
+from .dataset import Dataset, load_builtin, normalize_name
+from .interactions import InteractionIndex
+
+# Path of a compiled snapshot to load instead of the bundled JSON dataset
+SNAPSHOT_ENV_VAR = 'MEDVERIFY_SNAPSHOT'
+
+
+def _freeze(value):
+    """Recursively convert dicts to read-only mappings and lists to tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Return a mutable deep copy of a frozen value"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class KnowledgeBase:
+    """Immutable drug, interaction and dosage data plus derived indexes.
+
+    One instance is meant to be shared by every verifier in a process. All
+    tables are frozen at construction, so concurrent readers (for example
+    Streamlit script threads) need no locking.
+    """
+
+    def __init__(self, drug_database: Dict, interaction_database: Dict, dosage_guidelines: Dict,
+                 interaction_index: Optional[InteractionIndex] = None,
+                 version: str = '', checksum: str = '', aliases: Optional[Dict[str, str]] = None):
+        interaction_database = _freeze(interaction_database)
+        if interaction_index is None:
+            interaction_index = InteractionIndex(interaction_database)
+        object.__setattr__(self, 'drug_database', _freeze(drug_database))
+        object.__setattr__(self, 'aliases', _freeze(aliases or {}))
+        object.__setattr__(self, 'interaction_database', interaction_database)
+        object.__setattr__(self, 'dosage_guidelines', _freeze(dosage_guidelines))
+        object.__setattr__(self, 'interaction_index', interaction_index)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'checksum', checksum)
+        object.__setattr__(self, '_derived', {})
+        object.__setattr__(self, '_derived_lock', threading.RLock())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("KnowledgeBase is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("KnowledgeBase is read-only")
+
+    def derived(self, name: str, factory):
+        """Return a lazily built structure derived from this knowledge base.
+
+        ``factory(self)`` runs at most once per name; the result is cached for
+        the lifetime of the knowledge base, so it is rebuilt only when the data
+        (and therefore the knowledge base object) changes.
+        """
+        value = self._derived.get(name)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = factory(self)
+                    self._derived[name] = value
+        return value
+
+    def fuzzy_matcher(self):
+        """Trigram index over drug names, aliases and interaction names"""
+        return self.derived('fuzzy_matcher', _build_fuzzy_matcher)
+
+    def name_automaton(self):
+        """Aho-Corasick automaton over drug names, generic names, aliases and interaction names"""
+        return self.derived('name_automaton', _build_name_automaton)
+
+    def drug_catalog(self):
+        """Drug ids in knowledge-base order and per category, for paginated browsing"""
+        from .catalog import DrugCatalog
+        return self.derived('drug_catalog', DrugCatalog)
+
+    def search_index(self):
+        """Ranked full-text search over the drug catalogue"""
+        from .search import DrugSearchIndex
+        return self.derived('search_index', DrugSearchIndex)
+
+    def interaction_graph(self):
+        """Interaction network with node positions laid out once, for drawing"""
+        from .network import InteractionGraph
+        return self.derived('interaction_graph', InteractionGraph)
+
+    def canonical_name(self, name: str) -> str:
+        """Map a drug name, brand name or other alias to its canonical name"""
+        name = normalize_name(name)
+        return self.aliases.get(name, name)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Return the drug record key for ``name``, or None if the drug is unknown"""
+        name = self.canonical_name(name)
+        return name if name in self.drug_database else None
+
+    @classmethod
+    def from_dataset(cls, dataset: Dataset) -> 'KnowledgeBase':
+        """Build the knowledge base from a source dataset"""
+        return cls(dataset.drugs, dataset.interactions, dataset.dosage_guidelines,
+                   version=dataset.version, checksum=dataset.checksum(), aliases=dataset.aliases)
+
+    @classmethod
+    def from_snapshot(cls, path: str, verify: bool = True) -> 'KnowledgeBase':
+        """Memory-map a compiled snapshot built with ``python -m medverify.snapshot``"""
+        from .snapshot import (Snapshot, SnapshotAliasTable, SnapshotDrugTable,
+                               SnapshotInteractionIndex, SnapshotInteractionTable)
+
+        snapshot = Snapshot(path, verify=verify)
+        interaction_index = SnapshotInteractionIndex(snapshot)
+        return cls(SnapshotDrugTable(snapshot), SnapshotInteractionTable(interaction_index),
+                   snapshot.meta['dosage_guidelines'], interaction_index=interaction_index,
+                   version=snapshot.version, checksum=snapshot.checksum,
+                   aliases=SnapshotAliasTable(snapshot))
+
+    @classmethod
+    def builtin(cls) -> 'KnowledgeBase':
+        """Build the knowledge base from the bundled drug data"""
+        return cls.from_dataset(load_builtin())
+
+
+def _build_fuzzy_matcher(knowledge_base: KnowledgeBase):
+    from .fuzzy import FuzzyMatcher
+
+    def names():
+        for name, record in knowledge_base.drug_database.items():
+            yield name, name
+            yield record['generic_name'], name
+        for alias, canonical in knowledge_base.aliases.items():
+            yield alias, canonical
+        for name in knowledge_base.interaction_index.drug_names:
+            yield name, name
+
+    return FuzzyMatcher(names())
+
+
+def _build_name_automaton(knowledge_base: KnowledgeBase):
+    from .automaton import NameAutomaton
+
+    def names():
+        for name, record in knowledge_base.drug_database.items():
+            yield name, name
+            yield record['generic_name'], name
+        for alias, canonical in knowledge_base.aliases.items():
+            yield alias, canonical
+        for name in knowledge_base.interaction_index.drug_names:
+            yield name, name
+
+    return NameAutomaton(names())
+
+
+_default_knowledge_base: Optional[KnowledgeBase] = None
+_default_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """Return the shared knowledge base, building it on first use"""
+    global _default_knowledge_base
+    if _default_knowledge_base is None:
+        with _default_lock:
+            if _default_knowledge_base is None:
+                snapshot_path = os.environ.get(SNAPSHOT_ENV_VAR)
+                if snapshot_path:
+                    _default_knowledge_base = KnowledgeBase.from_snapshot(snapshot_path)
+                else:
+                    _default_knowledge_base = KnowledgeBase.builtin()
+    return _default_knowledge_base
@@ -0,0 +1,225 @@
+"""Interaction graph with a precomputed layout for network views"""
+
+from typing import Dict, List, NamedTuple, Optional
+
+# Drawing priority of severities; anything else ranks after these
+SEVERITY_ORDER = ('high', 'moderate', 'low')
+
+# Components up to this size get a force-directed layout; larger ones a spectral one
+FORCE_LAYOUT_MAX_NODES = 400
+FORCE_LAYOUT_ITERATIONS = 80
+
+
+class EgoNetwork(NamedTuple):
+    center: int
+    nodes: List[int]   # center first, then its partners
+    edges: List[int]   # edges among those nodes
+
+
+class InteractionGraph:
+    """The interaction table as arrays, with node positions computed once.
+
+    Node ids are those of the knowledge base's ``interaction_index``. Edges
+    are kept in drawing-priority order (severity, then how connected their
+    endpoints are), so a level-of-detail view is a prefix of the edge list.
+    Positions come from a layout of each connected component (force-directed
+    for small ones, spectral for large ones) packed side by side; ego
+    networks reuse them instead of laying anything out again.
+    """
+
+    def __init__(self, knowledge_base):
+        import numpy as np
+
+        index = knowledge_base.interaction_index
+        self.names: List[str] = list(index.drug_names)
+        self._ids: Dict[str, int] = {name: node for node, name in enumerate(self.names)}
+        size = len(self.names)
+        sources, targets, severities, descriptions = [], [], [], []
+        for id1, id2, info in index.iter_pairs():
+            sources.append(id1)
+            targets.append(id2)
+            severities.append(info['severity'])
+            descriptions.append(info['description'])
+        self.severity_levels = tuple(SEVERITY_ORDER) + tuple(sorted(set(severities) - set(SEVERITY_ORDER)))
+        level_codes = {level: code for code, level in enumerate(self.severity_levels)}
+
+        src = np.array(sources, dtype=np.int64)
+        dst = np.array(targets, dtype=np.int64)
+        codes = np.array([level_codes[severity] for severity in severities], dtype=np.int64)
+        self.degree = np.bincount(np.concatenate([src, dst]), minlength=size)
+
+        # Most severe first, then edges between well-connected drugs
+        order = np.lexsort((-(self.degree[src] + self.degree[dst]), codes))
+        self.sources = src[order]
+        self.targets = dst[order]
+        self.severity_codes = codes[order]
+        self.descriptions = [descriptions[i] for i in order]
+
+        # Node -> incident edges, as CSR
+        ends = np.concatenate([self.sources, self.targets])
+        edge_ids = np.concatenate([np.arange(len(order))] * 2)
+        by_node = np.argsort(ends, kind='stable')
+        self._incident = edge_ids[by_node]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(ends, minlength=size))])
+
+        self.positions = _layout(size, self.sources, self.targets)
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def node_id(self, name: str, knowledge_base=None) -> Optional[int]:
+        """Node of a drug name (or alias, given the knowledge base), None if it has no interactions"""
+        if knowledge_base is not None:
+            name = knowledge_base.canonical_name(name)
+        node = self._ids.get(name)
+        if node is None or not self.degree[node]:
+            return None
+        return node
+
+    def level_of_detail(self, max_edges: Optional[int]):
+        """Ids of the ``max_edges`` most important edges (all of them if None)"""
+        import numpy as np
+
+        count = len(self.sources) if max_edges is None else min(max_edges, len(self.sources))
+        return np.arange(count)
+
+    def ego(self, center: int) -> EgoNetwork:
+        """A drug, its interaction partners and all edges among them"""
+        import numpy as np
+
+        incident = self._incident[self._offsets[center]:self._offsets[center + 1]]
+        partners = np.unique(np.concatenate([self.sources[incident], self.targets[incident]]))
+        partners = partners[partners != center]
+        members = np.zeros(len(self.names), dtype=bool)
+        members[center] = True
+        members[partners] = True
+        edges = np.flatnonzero(members[self.sources] & members[self.targets])
+        return EgoNetwork(center, [center] + partners.tolist(), edges.tolist())
+
+    def segments(self, edges):
+        """x and y arrays for drawing ``edges`` as one line trace, NaN-separated"""
+        import numpy as np
+
+        edges = np.asarray(edges, dtype=np.int64)
+        start = self.positions[self.sources[edges]]
+        end = self.positions[self.targets[edges]]
+        gap = np.full(len(edges), np.nan)
+        xs = np.column_stack([start[:, 0], end[:, 0], gap]).ravel()
+        ys = np.column_stack([start[:, 1], end[:, 1], gap]).ravel()
+        return xs, ys
+
+
+def _layout(size: int, sources, targets):
+    """Positions for every node: each component laid out alone, then packed in rows"""
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse.csgraph import connected_components
+
+    positions = np.zeros((size, 2))
+    if not size:
+        return positions
+    adjacency = sparse.coo_matrix((np.ones(len(sources)), (sources, targets)), shape=(size, size)).tocsr()
+    adjacency = ((adjacency + adjacency.T) > 0).astype(np.float64)
+    count, labels = connected_components(adjacency, directed=False)
+    members = np.argsort(labels, kind='stable')
+    sizes = np.bincount(labels, minlength=count)
+    bounds = np.concatenate([[0], np.cumsum(sizes)]).tolist()
+    # Reordered once, so each component is a contiguous block on the diagonal
+    blocks = adjacency[members][:, members]
+    neighbours = np.diff(blocks.indptr) - (blocks.diagonal() != 0)
+
+    # Each component gets a square cell with side proportional to sqrt(size)
+    sides = np.sqrt(sizes).tolist()
+    row_width = max(max(sides), float(np.sqrt(sizes.sum())) * 1.2)
+    x = y = row_height = 0.0
+    for component in np.argsort(-sizes, kind='stable').tolist():
+        start, end = bounds[component], bounds[component + 1]
+        side = sides[component]
+        if x + side > row_width and x > 0:
+            x, y, row_height = 0.0, y - row_height * 1.1, 0.0
+        if end - start <= 3:
+            local = _small_layout(neighbours[start:end])
+        else:
+            local = _component_layout(blocks[start:end, start:end])
+            span = local.max(axis=0) - local.min(axis=0)
+            local = (local - local.min(axis=0)) / np.where(span > 0, span, 1.0)
+        positions[members[start:end]] = local * side * 0.9 + [x, y - side]
+        x += side * 1.1
+        row_height = max(row_height, side)
+    return positions
+
+
+def _small_layout(neighbours):
+    """Layout of a component of one to three nodes in the unit square, from each node's neighbour count"""
+    import numpy as np
+
+    if len(neighbours) == 1:
+        return np.zeros((1, 2))
+    if len(neighbours) == 2:
+        return np.array([[0.0, 0.0], [1.0, 0.0]])
+    if neighbours.min() == 2:
+        return np.array([[0.0, 0.0], [1.0, 0.0], [0.5, 1.0]])
+    # A path, drawn straight with its middle node in the middle
+    middle = int(neighbours.argmax())
+    positions = np.zeros((3, 2))
+    positions[[i for i in range(3) if i != middle], 0] = [0.0, 1.0]
+    positions[middle, 0] = 0.5
+    return positions
+
+
+def _component_layout(adjacency):
+    """Layout of one connected component, in arbitrary units"""
+    import numpy as np
+
+    size = adjacency.shape[0]
+    if size == 1:
+        return np.zeros((1, 2))
+    if size == 2:
+        return np.array([[0.0, 0.0], [1.0, 0.0]])
+    if size <= FORCE_LAYOUT_MAX_NODES:
+        return _force_layout(adjacency.toarray())
+    return _spectral_layout(adjacency)
+
+
+def _force_layout(adjacency):
+    """Fruchterman-Reingold on a dense adjacency matrix"""
+    import numpy as np
+
+    size = len(adjacency)
+    rng = np.random.default_rng(0)
+    positions = rng.random((size, 2))
+    k = 1.0 / np.sqrt(size)
+    temperature = 0.1
+    for _ in range(FORCE_LAYOUT_ITERATIONS):
+        delta = positions[:, None, :] - positions[None, :, :]
+        distance = np.maximum(np.sqrt((delta ** 2).sum(axis=-1)), 0.01)
+        force = k * k / distance ** 2 - adjacency * distance / k
+        displacement = (delta * force[:, :, None]).sum(axis=1)
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 0.01)
+        positions += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature *= 0.95
+    return positions
+
+
+def _spectral_layout(adjacency):
+    """Second and third eigenvectors of the normalized adjacency matrix, spread out.
+
+    Spectral coordinates pile most nodes of a hub-heavy graph onto a few
+    points, so the radius around the centroid is replaced by its rank
+    (keeping each node's direction and the radial order), which evens out
+    the density without another pass over the edges.
+    """
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse.linalg import eigsh
+
+    degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    scale = sparse.diags(1.0 / np.sqrt(degree))
+    normalized = scale @ adjacency @ scale
+    _, vectors = eigsh(normalized, k=3, which='LA', v0=np.ones(adjacency.shape[0]))
+    positions = vectors[:, :2] - vectors[:, :2].mean(axis=0)
+    radius = np.sqrt((positions ** 2).sum(axis=1))
+    angle = np.arctan2(positions[:, 1], positions[:, 0])
+    # sqrt of the rank gives uniform density over a disc
+    spread = np.sqrt((np.argsort(np.argsort(radius, kind='stable')) + 1) / len(radius))
+    return np.column_stack([spread * np.cos(angle), spread * np.sin(angle)])
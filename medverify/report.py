@@ -0,0 +1,354 @@
+"""PDF report generation"""
+
+import copy
+import io
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# Bump whenever the report layout or wording changes; cached reports are keyed on it
+TEMPLATE_VERSION = 1
+
+# Parsed paragraphs kept for reuse; report text repeats heavily across reports
+PARAGRAPH_CACHE_SIZE = 4096
+
+DISCLAIMER = (
+    "<b>IMPORTANT DISCLAIMER:</b><br/>"
+    "This report is generated by an AI system for informational purposes only. "
+    "It should NOT replace professional medical advice, diagnosis, or treatment. "
+    "Always consult with qualified healthcare providers for medical decisions. "
+    "The system's recommendations are based on general guidelines and may not account for individual medical history."
+)
+
+
+class ReportTemplate:
+    """Styles, table styles and parsed paragraphs shared by every report.
+
+    Building the style sheet and parsing paragraph markup are done once;
+    ``paragraph`` hands out shallow copies of cached, parsed paragraphs, so
+    each report gets its own layout state while the parse, and the line
+    breaks for each width, are shared.
+    """
+
+    def __init__(self, paragraph_cache_size: int = PARAGRAPH_CACHE_SIZE):
+        # ReportLab is only needed when a report is actually rendered
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.platypus import TableStyle
+
+        self._paragraph_class = _shared_paragraph_class()
+        self._paragraphs = OrderedDict()
+        self._paragraph_cache_size = paragraph_cache_size
+        self._lock = threading.Lock()
+
+        styles = getSampleStyleSheet()
+        self.styles = {
+            'Normal': styles['Normal'],
+            'Heading2': styles['Heading2'],
+            'Title': ParagraphStyle(
+                'CustomTitle',
+                parent=styles['Heading1'],
+                fontSize=20,
+                textColor=colors.darkblue,
+                alignment=TA_CENTER,
+                spaceAfter=30
+            ),
+            'Disclaimer': ParagraphStyle(
+                'Disclaimer',
+                parent=styles['Normal'],
+                fontSize=8,
+                textColor=colors.red,
+                alignment=TA_CENTER,
+                borderWidth=1,
+                borderColor=colors.red,
+                borderPadding=10
+            ),
+        }
+
+        self.patient_widths = [2*inch, 4*inch]
+        self.patient_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.white),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.darkblue),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('PADDING', (0, 0), (-1, -1), 12),
+        ])
+        self.medication_widths = [2*inch, 1.5*inch, 1.5*inch, 1.5*inch]
+        self.medication_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('PADDING', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ])
+        self.interaction_widths = [1.5*inch, 1.5*inch, 1*inch, 2.5*inch]
+        self.interaction_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.red),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('PADDING', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ])
+        self.care_widths = [1.2*inch, 2.5*inch, 2.8*inch]
+        self.care_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgreen),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('PADDING', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ])
+        self.score_colors = (colors.green, colors.orange, colors.red)
+
+    def paragraph(self, text: str, style: str = 'Normal'):
+        """A fresh copy of the parsed paragraph for ``text`` in the named style"""
+        key = (text, style)
+        with self._lock:
+            cached = self._paragraphs.get(key)
+            if cached is not None:
+                self._paragraphs.move_to_end(key)
+        if cached is None:
+            cached = self._paragraph_class(text, self.styles[style])
+            cached._line_breaks = {}
+            with self._lock:
+                self._paragraphs[key] = cached
+                while len(self._paragraphs) > self._paragraph_cache_size:
+                    self._paragraphs.popitem(last=False)
+        return copy.copy(cached)
+
+
+@lru_cache(maxsize=1)
+def _shared_paragraph_class():
+    from reportlab.platypus import Paragraph
+
+    class SharedParagraph(Paragraph):
+        """Paragraph whose line breaks are computed once and shared by its copies"""
+
+        def breakLines(self, width):
+            line_breaks = getattr(self, '_line_breaks', None)
+            if line_breaks is None:
+                # Pieces split off at a page break are not shared
+                return Paragraph.breakLines(self, width)
+            key = tuple(width)
+            lines = line_breaks.get(key)
+            if lines is None:
+                lines = line_breaks[key] = Paragraph.breakLines(self, width)
+            return lines
+
+    return SharedParagraph
+
+
+@lru_cache(maxsize=1)
+def get_report_template() -> ReportTemplate:
+    """The process-wide report template"""
+    return ReportTemplate()
+
+
+def generate_pdf_report(analysis_results: Dict, template: Optional[ReportTemplate] = None) -> bytes:
+    """Generate PDF report"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Spacer, Table
+
+    template = template or get_report_template()
+    paragraph = template.paragraph
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    story = []
+    
+    # Title
+    story.append(paragraph("🏥 Medical Prescription Verification Report", 'Title'))
+    story.append(Spacer(1, 20))
+    
+    # Patient Information
+    story.append(paragraph("👤 Patient Information", 'Heading2'))
+    patient_info = analysis_results['patient_info']
+    patient_data = [
+        ['Name:', patient_info['name']],
+        ['Age:', f"{patient_info['age']} years"],
+        ['Weight:', f"{patient_info['weight']} kg" if patient_info.get('weight') is not None else 'Not recorded'],
+        ['Report Date:', datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
+    ]
+    
+    patient_table = Table(patient_data, colWidths=template.patient_widths)
+    patient_table.setStyle(template.patient_style)
+    
+    story.append(patient_table)
+    story.append(Spacer(1, 25))
+    
+    # Safety Score
+    story.append(paragraph("📊 Safety Assessment", 'Heading2'))
+    safety_score = analysis_results['safety_score']
+    safe_color, caution_color, risk_color = template.score_colors
+    
+    if safety_score >= 80:
+        score_color = safe_color
+        status = "SAFE"
+    elif safety_score >= 60:
+        score_color = caution_color
+        status = "CAUTION REQUIRED"
+    else:
+        score_color = risk_color
+        status = "HIGH RISK"
+    
+    story.append(paragraph(f"Overall Safety Score: <font color='{score_color}' size='14'><b>{safety_score}/100</b></font>"))
+    story.append(paragraph(f"Status: <font color='{score_color}' size='12'><b>{status}</b></font>"))
+    story.append(Spacer(1, 20))
+    
+    # Medications
+    story.append(paragraph("💊 Prescribed Medications", 'Heading2'))
+    
+    med_data = [['Medication', 'Dosage', 'Frequency', 'Status']]
+    for med in analysis_results['medications']:
+        status = "✅ Safe" if med['age_appropriate'] and med['dosage_appropriate'] and med['found_in_database'] else "⚠️ Review Required"
+        med_data.append([
+            med['name'],
+            med['dosage'],
+            med['frequency'],
+            status
+        ])
+    
+    med_table = Table(med_data, colWidths=template.medication_widths)
+    med_table.setStyle(template.medication_style)
+    
+    story.append(med_table)
+    story.append(Spacer(1, 20))
+    
+    # Medication warnings
+    for med in analysis_results['medications']:
+        if med['warnings']:
+            story.append(paragraph(f"⚠️ <b>{med['name']} Warnings:</b>"))
+            for warning in med['warnings']:
+                story.append(paragraph(f"  • {warning}"))
+            story.append(Spacer(1, 10))
+    
+    # Drug Interactions
+    if analysis_results['interactions']:
+        story.append(paragraph("⚠️ Drug Interactions Detected", 'Heading2'))
+        
+        interaction_data = [['Drug 1', 'Drug 2', 'Severity', 'Description']]
+        for interaction in analysis_results['interactions']:
+            interaction_data.append([
+                interaction['drug1'],
+                interaction['drug2'],
+                interaction['severity'].upper(),
+                interaction['description']
+            ])
+        
+        interaction_table = Table(interaction_data, colWidths=template.interaction_widths)
+        interaction_table.setStyle(template.interaction_style)
+        
+        story.append(interaction_table)
+        story.append(Spacer(1, 20))
+    else:
+        story.append(paragraph("✅ No Drug Interactions Detected", 'Heading2'))
+        story.append(Spacer(1, 15))
+    
+    # Alternative Medications
+    story.append(paragraph("🔄 Alternative Medications", 'Heading2'))
+    for med in analysis_results['medications']:
+        if med['alternatives'] and med['alternatives'] != ['Consult healthcare provider for alternatives']:
+            story.append(paragraph(f"<b>{med['name']} alternatives:</b>"))
+            for alt in med['alternatives'][:3]:  # Show top 3 alternatives
+                story.append(paragraph(f"  • {alt.title()}"))
+            story.append(Spacer(1, 10))
+    
+    story.append(Spacer(1, 15))
+    
+    # Recommendations
+    story.append(paragraph("📋 Healthcare Recommendations", 'Heading2'))
+    for i, rec in enumerate(analysis_results['recommendations'][:8], 1):  # Limit to 8 recommendations
+        story.append(paragraph(f"{i}. {rec}"))
+    
+    story.append(Spacer(1, 20))
+    
+    # Home Care Recommendations
+    story.append(paragraph("🏠 Home Care Guidelines", 'Heading2'))
+    
+    care_data = [['Category', 'Recommendation', 'Benefit']]
+    for remedy in analysis_results['home_remedies']:
+        care_data.append([
+            remedy['category'],
+            remedy['recommendation'],
+            remedy['benefit']
+        ])
+    
+    care_table = Table(care_data, colWidths=template.care_widths)
+    care_table.setStyle(template.care_style)
+    
+    story.append(care_table)
+    story.append(Spacer(1, 20))
+    
+    # Disclaimer
+    story.append(paragraph(DISCLAIMER, 'Disclaimer'))
+    
+    doc.build(story)
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def benchmark(analysis_results: Dict, repeat: int = 50, cached: bool = True) -> float:
+    """Reports per second for ``analysis_results``; ``cached=False`` rebuilds the template per report"""
+    generate_pdf_report(analysis_results)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        generate_pdf_report(analysis_results, None if cached else ReportTemplate())
+    elapsed = time.perf_counter() - started
+    return repeat / elapsed if elapsed else float('inf')
+
+
+def _sample_results() -> Dict:
+    from .verifier import MedicalPrescriptionVerifier
+
+    return MedicalPrescriptionVerifier().analyze_prescription(
+        {'name': 'Sample Patient', 'age': 45, 'weight': 70},
+        [{'name': 'Paracetamol', 'dosage': '500mg', 'frequency': 'every 6 hours'},
+         {'name': 'Warfarin', 'dosage': '5mg', 'frequency': 'daily'},
+         {'name': 'Aspirin', 'dosage': '100mg', 'frequency': 'daily'}])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(prog='python -m medverify.report',
+                                     description='Benchmark PDF report generation')
+    parser.add_argument('results', nargs='?',
+                        help='JSON file with one analysis result (default: a built-in sample)')
+    parser.add_argument('--repeat', type=int, default=50, help='reports per measurement (default: 50)')
+    args = parser.parse_args(argv)
+
+    if args.results:
+        with open(args.results, encoding='utf-8') as f:
+            results = json.load(f)
+    else:
+        results = _sample_results()
+
+    uncached = benchmark(results, args.repeat, cached=False)
+    cached = benchmark(results, args.repeat)
+    print(f"template per report: {uncached:.1f} reports/s")
+    print(f"shared template:     {cached:.1f} reports/s ({cached / uncached:.2f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
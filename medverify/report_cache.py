@@ -0,0 +1,154 @@
+"""Content-addressed cache of rendered PDF reports.
+
+Reports are keyed by a SHA-256 of the analysis result and the report
+template version, so an unchanged analysis is never rendered twice: repeat
+downloads are served from a bounded in-memory LRU, and, when a directory is
+configured, from ``<key>.pdf`` files shared by every process using it. A
+cached report keeps the date it was first rendered.
+
+Reports contain patient details, so nothing is written to disk unless a
+directory is given (or ``MEDVERIFY_REPORT_CACHE`` is set); files are created
+readable by the owner only.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+from .cache import CacheStats, LRUCache
+
+# Directory for the process-wide cache's on-disk store; unset keeps reports in memory only
+REPORT_CACHE_ENV_VAR = 'MEDVERIFY_REPORT_CACHE'
+
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES = 1024 * 1024 * 1024
+
+
+def report_key(analysis_results: Dict) -> str:
+    """Hex digest identifying the report for an analysis result"""
+    from .report import TEMPLATE_VERSION
+
+    digest = hashlib.sha256(f"medverify-report:{TEMPLATE_VERSION}\n".encode('utf-8'))
+    digest.update(json.dumps(analysis_results, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """PDF bytes by report key, in memory and optionally on disk.
+
+    The disk store is pruned oldest-first (by last use) once it grows past
+    ``max_disk_bytes``; writes go through a temporary file and a rename, so
+    concurrent processes never see a partial report.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_memory_bytes: int = DEFAULT_MEMORY_BYTES,
+                 max_disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.memory = LRUCache(max_bytes=max_memory_bytes)
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self.disk_hits = 0
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    def get_or_render(self, analysis_results: Dict, render=None) -> bytes:
+        """The PDF for ``analysis_results``, rendering it only on a miss"""
+        key = report_key(analysis_results)
+        pdf = self.get(key)
+        if pdf is None:
+            if render is None:
+                from .report import generate_pdf_report as render
+            pdf = render(analysis_results)
+            self.put(key, pdf)
+        return pdf
+
+    def get(self, key: str) -> Optional[bytes]:
+        pdf = self.memory.get(key)
+        if pdf is None and self.directory:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    pdf = f.read()
+                os.utime(path)
+            except OSError:
+                return None
+            with self._lock:
+                self.disk_hits += 1
+            self.memory.put(key, pdf, len(pdf))
+        return pdf
+
+    def put(self, key: str, pdf: bytes) -> None:
+        self.memory.put(key, pdf, len(pdf))
+        if not self.directory or os.path.exists(self._path(key)):
+            return
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pdf)
+            os.replace(temporary, self._path(key))
+        except OSError:
+            # The disk store is best-effort; the report is still cached in memory
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            return
+        with self._lock:
+            self._disk_bytes += len(pdf)
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._prune()
+
+    def stats(self) -> CacheStats:
+        """Memory-cache statistics; ``disk_hits`` counts misses served from disk"""
+        return self.memory.stats()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _disk_entries(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pdf'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield stat.st_mtime, entry.path, stat.st_size
+
+    def _prune(self) -> None:
+        """Delete least recently used files until the store is under three quarters of its cap"""
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, _, size in entries)
+        target = self.max_disk_bytes * 3 // 4
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+
+_report_cache: Optional[ReportCache] = None
+_report_cache_lock = threading.Lock()
+
+
+def get_report_cache() -> ReportCache:
+    """The process-wide report cache, using ``MEDVERIFY_REPORT_CACHE`` as its directory if set"""
+    global _report_cache
+    if _report_cache is None:
+        with _report_cache_lock:
+            if _report_cache is None:
+                _report_cache = ReportCache(os.environ.get(REPORT_CACHE_ENV_VAR) or None)
+    return _report_cache
+
+
+def cached_pdf_report(analysis_results: Dict) -> bytes:
+    """``generate_pdf_report`` through the process-wide report cache"""
+    return get_report_cache().get_or_render(analysis_results)
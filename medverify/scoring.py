@@ -0,0 +1,195 @@
+"""Safety scoring as sparse matrix operations.
+
+A regimen is a row of drug counts over the knowledge-base vocabulary. The
+score of a batch of regimens ``X`` (one row each) is::
+
+    base - interactions(X) - medication_penalty
+
+where ``interactions(X)`` sums the severity weight of every interacting
+pair of medications using a symmetric drug-by-drug weight matrix ``W``::
+
+    interactions(X) = ((X @ W) * X).sum(axis=1) / 2 - X @ diag(W) / 2
+
+The second term removes a medication's pairing with itself, so two
+entries of the same drug count as one pair, as in ``find_pairs``.
+The verifier scores batches this way, passing the exact per-medication
+deductions it computed; a single regimen uses ``ScoringWeights.score``.
+For stored regimens where only the drugs are known, ``drug_penalty``
+supplies the fixed per-drug deductions (contraindication warnings, or the
+not-found penalty for names outside the drug database), and ``extra``
+carries patient-dependent ones such as age and dosage findings. Changing
+weights (``with_weights``) only re-derives ``W`` and ``drug_penalty``
+from arrays built once.
+"""
+
+import copy
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+
+class ScoringWeights(NamedTuple):
+    base: int = 100
+    severity: Tuple[Tuple[str, int], ...] = (('high', 30), ('moderate', 15), ('low', 5))
+    other_severity: int = 5  # any severity not listed above
+    warning: int = 5         # per warning on a medication
+    age: int = 20            # medication not appropriate for the patient's age
+    dosage: int = 10         # dosage outside the guideline
+    not_found: int = 15      # medication missing from the drug database
+
+    def severity_weight(self, severity: str) -> int:
+        return dict(self.severity).get(severity, self.other_severity)
+
+    def medication_penalty(self, medication: Dict) -> int:
+        """Deduction for one entry of ``results['medications']``"""
+        penalty = len(medication['warnings']) * self.warning
+        if not medication['age_appropriate']:
+            penalty += self.age
+        if not medication['dosage_appropriate']:
+            penalty += self.dosage
+        if not medication['found_in_database']:
+            penalty += self.not_found
+        return penalty
+
+    def score(self, results: Dict) -> int:
+        """Score one analysis result from its interactions and medications.
+
+        Equivalent to ``SafetyScorer.score`` for a single regimen, without the
+        matrix set-up cost.
+        """
+        penalty = sum(self.severity_weight(interaction['severity']) for interaction in results['interactions'])
+        penalty += sum(self.medication_penalty(medication) for medication in results['medications'])
+        return max(0, self.base - penalty)
+
+
+DEFAULT_WEIGHTS = ScoringWeights()
+
+
+class SafetyScorer:
+    """Sparse severity matrix and per-drug penalty vector for a knowledge base"""
+
+    def __init__(self, knowledge_base, weights: ScoringWeights = DEFAULT_WEIGHTS):
+        import numpy as np
+
+        index = knowledge_base.interaction_index
+        # Interaction names keep their index ids; remaining drug records follow
+        self.vocabulary: Dict[str, int] = dict(index.drug_ids)
+        for name in knowledge_base.drug_database:
+            self.vocabulary.setdefault(name, len(self.vocabulary))
+        size = len(self.vocabulary)
+
+        rows, cols, codes, self.severity_levels = index.severity_columns()
+
+        # Store each pair in both directions; self-pairs only once
+        off_diagonal = rows != cols
+        self._rows = np.concatenate([rows, cols[off_diagonal]])
+        self._cols = np.concatenate([cols, rows[off_diagonal]])
+        self._codes = np.concatenate([codes, codes[off_diagonal]])
+
+        self._drug_database = knowledge_base.drug_database
+        self._in_database = np.zeros(size, dtype=bool)
+        self._in_database[np.fromiter((self.vocabulary[name] for name in self._drug_database), dtype=np.int64)] = True
+        # Counting contraindications decodes every record, so it waits until drug_penalty is needed
+        self._contraindications = None
+
+        self.size = size
+        self._apply_weights(weights)
+
+    def with_weights(self, weights: ScoringWeights) -> 'SafetyScorer':
+        """Return a scorer for new weights that shares this one's sparsity structure"""
+        scorer = copy.copy(self)
+        scorer._apply_weights(weights)
+        return scorer
+
+    def _apply_weights(self, weights: ScoringWeights) -> None:
+        import numpy as np
+        from scipy import sparse
+
+        self.weights = weights
+        level_weights = np.array([weights.severity_weight(level) for level in self.severity_levels],
+                                 dtype=np.float64)
+        data = level_weights[self._codes] if len(self._codes) else np.zeros(0)
+        self.severity_matrix = sparse.csr_matrix((data, (self._rows, self._cols)),
+                                                 shape=(self.size, self.size))
+        self._diagonal = self.severity_matrix.diagonal()
+        self._drug_penalty = None
+
+    @property
+    def drug_penalty(self):
+        """Fixed deductions per vocabulary drug, for scoring regimens where only the drugs are known"""
+        import numpy as np
+
+        if self._drug_penalty is None:
+            if self._contraindications is None:
+                contraindications = np.zeros(self.size, dtype=np.int64)
+                for name, record in self._drug_database.items():
+                    contraindications[self.vocabulary[name]] = len(record['contraindications'])
+                self._contraindications = contraindications
+            weights = self.weights
+            # Drugs outside the database get the same deductions as an unknown name
+            self._drug_penalty = np.where(self._in_database,
+                                          self._contraindications * weights.warning,
+                                          weights.warning + weights.not_found).astype(np.float64)
+        return self._drug_penalty
+
+    def encode(self, regimens: Iterable[Sequence[str]]):
+        """Encode regimens of canonical names as a sparse count matrix.
+
+        Returns ``(X, unknown)`` where ``unknown`` counts the names per regimen
+        that are not in the vocabulary.
+        """
+        import numpy as np
+        from scipy import sparse
+
+        rows, cols, unknown = [], [], []
+        vocabulary = self.vocabulary
+        for row, names in enumerate(regimens):
+            missing = 0
+            for name in names:
+                drug_id = vocabulary.get(name)
+                if drug_id is None:
+                    missing += 1
+                else:
+                    rows.append(row)
+                    cols.append(drug_id)
+            unknown.append(missing)
+        data = np.ones(len(rows), dtype=np.float64)
+        # Duplicate (row, col) entries are summed into counts
+        matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(unknown), self.size))
+        return matrix, np.asarray(unknown, dtype=np.float64)
+
+    def interaction_penalty(self, regimens):
+        """Summed severity weight of all interacting pairs, per regimen row"""
+        import numpy as np
+
+        pairwise = np.asarray(regimens.dot(self.severity_matrix).multiply(regimens).sum(axis=1)).ravel()
+        self_pairs = regimens.dot(self._diagonal)
+        return (pairwise - self_pairs) / 2
+
+    def score(self, regimens, medication_penalty):
+        """Safety scores (0-100) given each regimen's total per-medication deductions"""
+        import numpy as np
+
+        penalty = self.interaction_penalty(regimens) + np.asarray(medication_penalty, dtype=np.float64)
+        scores = np.rint(self.weights.base - penalty)
+        return np.maximum(scores, 0).astype(np.int64)
+
+    def score_from_drugs(self, regimens, unknown=None, extra=None):
+        """Safety scores using the fixed per-drug penalty vector.
+
+        For re-scoring stored regimens where only the drugs are known;
+        ``extra`` adds patient-dependent deductions (age, dosage) per row.
+        """
+        penalty = regimens.dot(self.drug_penalty)
+        if unknown is not None:
+            penalty = penalty + unknown * (self.weights.warning + self.weights.not_found)
+        if extra is not None:
+            penalty = penalty + extra
+        return self.score(regimens, penalty)
+
+    def score_regimens(self, regimens: Iterable[Sequence[str]], extra: Optional[Sequence[float]] = None):
+        """Encode and score regimens of canonical names in one call"""
+        import numpy as np
+
+        matrix, unknown = self.encode(regimens)
+        if extra is not None:
+            extra = np.asarray(extra, dtype=np.float64)
+        return self.score_from_drugs(matrix, unknown, extra)
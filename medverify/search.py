@@ -0,0 +1,160 @@
+"""Inverted-index full-text search over the drug catalogue"""
+
+import re
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional
+
+_TOKEN_RE = re.compile(r'[0-9a-z]+')
+
+# Relevance of a term found in each field
+FIELD_WEIGHTS = (
+    ('name', 10.0),
+    ('aliases', 8.0),
+    ('generic_name', 8.0),
+    ('category', 3.0),
+    ('interactions', 2.0),
+    ('contraindications', 1.5),
+    ('side_effects', 1.0),
+)
+
+# Share of a field's weight for a word that only starts with, or contains, the query term
+PREFIX_FACTOR = 0.6
+INFIX_FACTOR = 0.3
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _ngrams(token: str, n: int) -> List[str]:
+    return [token[i:i + n] for i in range(len(token) - n + 1)]
+
+
+class SearchResult(NamedTuple):
+    ids: List[int]                    # catalogue ids, most relevant first
+    scores: List[float]
+    total: int                        # matches before ``limit`` was applied
+    category_counts: Dict[str, int]   # matches per category, before any category filter
+
+
+class DrugSearchIndex:
+    """Ranked search over drug names, aliases, generic names, categories,
+    interactions, contraindications and side effects.
+
+    Words are stored in a sorted vocabulary with CSR postings (drug ids and
+    field weights), so all words starting with a query term are one
+    contiguous slice; a bigram and trigram index over the vocabulary finds
+    words that merely contain it. Scores are summed per drug with NumPy, every query
+    term must match, and the top results are picked with a partial sort.
+    Drug ids are those of ``knowledge_base.drug_catalog()``.
+    """
+
+    def __init__(self, knowledge_base):
+        import numpy as np
+
+        catalog = knowledge_base.drug_catalog()
+        self.catalog = catalog
+        aliases: Dict[str, List[str]] = {}
+        for alias, canonical in knowledge_base.aliases.items():
+            aliases.setdefault(canonical, []).append(alias)
+
+        postings: Dict[str, Dict[int, float]] = {}
+        for drug_id, name in enumerate(catalog.names):
+            record = knowledge_base.drug_database[name]
+            fields = {'name': name, 'aliases': aliases.get(name, ())}
+            for field, weight in FIELD_WEIGHTS:
+                value = fields[field] if field in fields else record.get(field, '')
+                text = value if isinstance(value, str) else ' '.join(value)
+                for token in tokenize(text):
+                    found = postings.setdefault(token, {})
+                    # A word counts once per drug, at its best field
+                    if found.get(drug_id, 0.0) < weight:
+                        found[drug_id] = weight
+
+        self.vocabulary: List[str] = sorted(postings)
+        offsets = [0]
+        ids: List[int] = []
+        weights: List[float] = []
+        for token in self.vocabulary:
+            for drug_id, weight in postings[token].items():
+                ids.append(drug_id)
+                weights.append(weight)
+            offsets.append(len(ids))
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._ids = np.array(ids, dtype=np.int32)
+        self._weights = np.array(weights, dtype=np.float32)
+
+        self._grams: Dict[str, List[int]] = {}
+        for position, token in enumerate(self.vocabulary):
+            for gram in set(_ngrams(token, 2)) | set(_ngrams(token, 3)):
+                self._grams.setdefault(gram, []).append(position)
+
+        codes = {category: code for code, category in enumerate(catalog.categories)}
+        self._category_codes = np.array([codes[category] for category in catalog.category_of], dtype=np.int32)
+
+    def _term_scores(self, term: str):
+        """Per-drug score for one query term: exact, prefix and infix word matches"""
+        import numpy as np
+
+        size = len(self.catalog)
+        offsets, ids, weights = self._offsets, self._ids, self._weights
+        low = bisect_left(self.vocabulary, term)
+        high = bisect_left(self.vocabulary, term + '\uffff')
+        start, end = offsets[low], offsets[high]
+        scores = np.zeros(size)
+        scores += np.bincount(ids[start:end], weights[start:end] * PREFIX_FACTOR, minlength=size)
+        if low < high and self.vocabulary[low] == term:
+            start, end = offsets[low], offsets[low + 1]
+            scores += np.bincount(ids[start:end], weights[start:end] * (1.0 - PREFIX_FACTOR), minlength=size)
+
+        if len(term) >= 2:
+            candidates = None
+            for gram in set(_ngrams(term, min(len(term), 3))):
+                positions = self._grams.get(gram)
+                if positions is None:
+                    candidates = set()
+                    break
+                candidates = set(positions) if candidates is None else candidates.intersection(positions)
+            vocabulary = self.vocabulary
+            infix = np.fromiter((position for position in candidates or ()
+                                 if not low <= position < high and term in vocabulary[position]), dtype=np.int64)
+            if len(infix):
+                # Concatenate the postings slices of all those words without a Python loop
+                starts = offsets[infix]
+                lengths = offsets[infix + 1] - starts
+                postings = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+                scores += np.bincount(ids[postings], weights[postings] * INFIX_FACTOR, minlength=size)
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = 50, category: Optional[str] = None) -> SearchResult:
+        """Drugs matching every word of ``query``, best first; ``limit=None`` returns all matches"""
+        import numpy as np
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return SearchResult([], [], 0, {})
+        total = None
+        matched = None
+        for term in terms:
+            scores = self._term_scores(term)
+            hits = scores > 0
+            matched = hits if matched is None else matched & hits
+            # Damped so that one term found in many fields cannot outweigh the others
+            total = np.log1p(scores) if total is None else total + np.log1p(scores)
+
+        counts = np.bincount(self._category_codes[matched], minlength=len(self.catalog.categories))
+        category_counts = {self.catalog.categories[code]: int(count)
+                           for code, count in enumerate(counts) if count}
+        if category is not None:
+            if category not in self.catalog.categories:
+                return SearchResult([], [], 0, category_counts)
+            matched &= self._category_codes == self.catalog.categories.index(category)
+
+        candidates = np.flatnonzero(matched)
+        if limit is not None and len(candidates) > limit:
+            top = np.argpartition(-total[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        # Best score first; ties keep catalogue order
+        order = np.lexsort((candidates, -total[candidates]))
+        ranked = candidates[order]
+        return SearchResult(ranked.tolist(), total[ranked].tolist(), int(matched.sum()), category_counts)
@@ -0,0 +1,131 @@
+"""Incremental analysis of a prescription that is being edited"""
+
+from typing import Dict, List, Optional, Tuple
+
+from .knowledge_base import thaw
+from .scoring import DEFAULT_WEIGHTS
+
+
+class _Entry:
+    __slots__ = ('key', 'medication', 'resolution', 'drug_id', 'analysis', 'penalty')
+
+    def __init__(self, key: int, medication: Dict, resolution, drug_id: Optional[int]):
+        self.key = key
+        self.medication = medication
+        self.resolution = resolution
+        self.drug_id = drug_id
+        self.analysis = None
+        self.penalty = 0
+
+
+class AnalysisSession:
+    """A prescription under construction, re-analyzed by deltas.
+
+    The session keeps each medication's findings, the set of interacting
+    pairs and the running safety-score deductions. Adding a medication only
+    analyzes that drug and checks it against the drugs already present;
+    removing one retracts its findings and the pairs it took part in.
+    ``results()`` returns the same result as ``analyze_prescription`` on the
+    current list, without re-checking the rest of the regimen.
+    """
+
+    def __init__(self, verifier, patient_data: Dict, medications: Optional[List[Dict]] = None):
+        self.verifier = verifier
+        self.patient_data = patient_data
+        self._entries: List[_Entry] = []
+        self._next_key = 0
+        self._by_drug: Dict[int, List[_Entry]] = {}
+        self._pairs: Dict[Tuple[int, int], Dict] = {}  # (entry key, entry key) -> interaction info
+        self._interaction_penalty = 0
+        self._medication_penalty = 0
+        for medication in medications or []:
+            self.add(medication)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def medications(self) -> List[Dict]:
+        return [entry.medication for entry in self._entries]
+
+    @property
+    def interaction_count(self) -> int:
+        return len(self._pairs)
+
+    @property
+    def safety_score(self) -> int:
+        return max(0, DEFAULT_WEIGHTS.base - self._interaction_penalty - self._medication_penalty)
+
+    def add(self, medication: Dict) -> None:
+        """Append a medication, checking only its pairs with the current regimen"""
+        verifier = self.verifier
+        resolution = verifier._cached_resolution(medication['name'])
+        entry = _Entry(self._next_key, medication, resolution,
+                       verifier.interaction_index.drug_id(resolution.drug_name))
+        self._next_key += 1
+        self._analyze_entry(entry)
+
+        if entry.drug_id is not None:
+            index = verifier.interaction_index
+            for other_id in index._partners(entry.drug_id, self._by_drug):
+                info = index.pair_info(entry.drug_id, other_id)
+                for other in self._by_drug[other_id]:
+                    self._pairs[(other.key, entry.key)] = info
+                    self._interaction_penalty += DEFAULT_WEIGHTS.severity_weight(info['severity'])
+            self._by_drug.setdefault(entry.drug_id, []).append(entry)
+        self._entries.append(entry)
+
+    def remove(self, position: int) -> Dict:
+        """Remove the medication at ``position`` and retract its contributions"""
+        entry = self._entries.pop(position)
+        self._medication_penalty -= entry.penalty
+        if entry.drug_id is not None:
+            self._by_drug[entry.drug_id].remove(entry)
+            if not self._by_drug[entry.drug_id]:
+                del self._by_drug[entry.drug_id]
+            for pair in [pair for pair in self._pairs if entry.key in pair]:
+                info = self._pairs.pop(pair)
+                self._interaction_penalty -= DEFAULT_WEIGHTS.severity_weight(info['severity'])
+        return entry.medication
+
+    def set_patient(self, patient_data: Dict) -> None:
+        """Update patient details; per-medication findings are redone only if the patient band changes"""
+        verifier = self.verifier
+        band_changed = verifier._patient_band(patient_data) != verifier._patient_band(self.patient_data)
+        self.patient_data = patient_data
+        if band_changed:
+            for entry in self._entries:
+                self._analyze_entry(entry)
+
+    def _analyze_entry(self, entry: _Entry) -> None:
+        self._medication_penalty -= entry.penalty
+        entry.analysis = self.verifier._analyze_medication(self.patient_data, entry.medication, entry.resolution)
+        entry.penalty = DEFAULT_WEIGHTS.medication_penalty(entry.analysis)
+        self._medication_penalty += entry.penalty
+
+    def results(self) -> Dict:
+        """Full analysis result for the current regimen"""
+        positions = {entry.key: position for position, entry in enumerate(self._entries)}
+        interactions = []
+        for i, j, info in sorted((min(positions[a], positions[b]), max(positions[a], positions[b]), info)
+                                 for (a, b), info in self._pairs.items()):
+            interactions.append({
+                'drug1': self._entries[i].analysis['name'],
+                'drug2': self._entries[j].analysis['name'],
+                'severity': info['severity'],
+                'description': info['description']
+            })
+
+        results = {
+            'patient_info': self.patient_data,
+            'medications': [dict(entry.analysis, drug_info=thaw(entry.analysis['drug_info']),
+                                 warnings=list(entry.analysis['warnings']),
+                                 alternatives=list(entry.analysis['alternatives']))
+                            for entry in self._entries],
+            'interactions': interactions,
+            'safety_score': self.safety_score,
+            'recommendations': [],
+            'home_remedies': []
+        }
+        self.verifier._complete_results(results, self.medications)
+        return results
@@ -0,0 +1,456 @@
+"""Compiled, memory-mapped binary snapshots of the drug knowledge base.
+
+A snapshot is built once from a source dataset (see ``medverify.dataset``)
+and then memory-mapped at startup. Nothing is parsed up front: strings live
+in a shared string table, drug records and interaction pairs are fixed-width
+integer columns, and interaction adjacency is stored as CSR offset arrays.
+Because the file is mapped read-only, its pages are shared by every worker
+process on the machine.
+
+Build a snapshot with::
+
+    python -m medverify.snapshot build medverify/data/drugs.json drugs.mvkb
+
+and point ``MEDVERIFY_SNAPSHOT`` at it to have the verifier load it.
+
+File layout (all integers little-endian)::
+
+    header     magic, format version, section count, SHA-256 of the rest
+    directory  (name, offset, length) per section
+    sections   8-byte aligned arrays; see ``compile_snapshot``
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+from .dataset import DRUG_AGE_FIELDS, DRUG_LIST_FIELDS, DRUG_TEXT_FIELDS, Dataset, drug_age_limits, load_source
+from .interactions import InteractionIndex
+
+MAGIC = b'MVKB'
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct('<4sHHI32s')
+_SECTION = struct.Struct('<8sQQ')
+_ALIGN = 8
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is malformed, corrupt or incompatible"""
+
+
+class _StringTable:
+    """Interns strings into sequential ids while building a snapshot"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.offsets = array('Q', [0])
+        self.data = bytearray()
+
+    def add(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.ids)
+            self.ids[value] = string_id
+            self.data += value.encode('utf-8')
+            self.offsets.append(len(self.data))
+        return string_id
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def compile_snapshot(dataset: Dataset, output_path: str) -> None:
+    """Write ``dataset`` to ``output_path`` as a binary snapshot"""
+    strings = _StringTable()
+
+    drug_columns = array('I')
+    list_offsets = array('I', [0])
+    list_values = array('I')
+    for name, record in dataset.drugs.items():
+        drug_columns.append(strings.add(name))
+        drug_columns.extend(strings.add(record[field]) for field in DRUG_TEXT_FIELDS)
+        for field in DRUG_LIST_FIELDS:
+            list_values.extend(strings.add(item) for item in record[field])
+            list_offsets.append(len(list_values))
+
+    alias_columns = array('I')
+    for alias, canonical in dataset.aliases.items():
+        alias_columns.extend((strings.add(alias), strings.add(canonical)))
+
+    # Interaction endpoints get their own dense node ids; pairs are canonical (low, high)
+    node_ids: Dict[str, int] = {}
+    node_names = array('I')
+    pairs: Dict[Tuple[int, int], Tuple[int, int, int, int]] = {}
+    for (drug1, drug2), info in dataset.interactions.items():
+        ids = []
+        for drug in (drug1, drug2):
+            node = node_ids.get(drug)
+            if node is None:
+                node = node_ids[drug] = len(node_ids)
+                node_names.append(strings.add(drug))
+            ids.append(node)
+        key = InteractionIndex.pair_key(ids[0], ids[1])
+        pairs[key] = (ids[0], ids[1], strings.add(info['severity']), strings.add(info['description']))
+
+    pair_columns = array('I')
+    neighbours: List[List[Tuple[int, int]]] = [[] for _ in range(len(node_ids))]
+    for pair_index, ((low, high), columns) in enumerate(sorted(pairs.items())):
+        pair_columns.extend(columns)
+        neighbours[low].append((high, pair_index))
+        if high != low:
+            neighbours[high].append((low, pair_index))
+
+    adjacency_offsets = array('I', [0])
+    adjacency_nodes = array('I')
+    adjacency_pairs = array('I')
+    for row in neighbours:
+        row.sort()
+        adjacency_nodes.extend(node for node, _ in row)
+        adjacency_pairs.extend(pair_index for _, pair_index in row)
+        adjacency_offsets.append(len(adjacency_nodes))
+
+    meta = {
+        'version': dataset.version,
+        'checksum': dataset.checksum(),
+        'dosage_guidelines': dataset.dosage_guidelines,
+        'drug_count': len(dataset.drugs),
+        'alias_count': len(dataset.aliases),
+        'interaction_count': len(pairs),
+        'node_count': len(node_ids),
+        # Sparse: only drugs with an age restriction
+        'age_limits': {name: [record[field] for field in DRUG_AGE_FIELDS]
+                       for name, record in dataset.drugs.items()
+                       if any(record[field] is not None for field in DRUG_AGE_FIELDS)},
+    }
+
+    sections = [
+        (b'meta', json.dumps(meta).encode('utf-8')),
+        (b'stroff', _little_endian(strings.offsets)),
+        (b'strdat', bytes(strings.data)),
+        (b'drugcol', _little_endian(drug_columns)),
+        (b'lstoff', _little_endian(list_offsets)),
+        (b'lstval', _little_endian(list_values)),
+        (b'alias', _little_endian(alias_columns)),
+        (b'inode', _little_endian(node_names)),
+        (b'ipair', _little_endian(pair_columns)),
+        (b'adjoff', _little_endian(adjacency_offsets)),
+        (b'adjnode', _little_endian(adjacency_nodes)),
+        (b'adjpair', _little_endian(adjacency_pairs)),
+    ]
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    directory = bytearray()
+    body = bytearray()
+    for name, payload in sections:
+        padding = -(offset + len(body)) % _ALIGN
+        body += b'\0' * padding
+        directory += _SECTION.pack(name, offset + len(body), len(payload))
+        body += payload
+
+    digest = hashlib.sha256(directory)
+    digest.update(body)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(sections), digest.digest())
+    with open(output_path, 'wb') as f:
+        f.write(header)
+        f.write(directory)
+        f.write(body)
+
+
+class Snapshot:
+    """Read-only view over a memory-mapped snapshot file"""
+
+    def __init__(self, path: str, verify: bool = True):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as exc:
+                raise SnapshotError(f"{path}: empty snapshot file") from exc
+        self._view = memoryview(self._mmap)
+
+        if len(self._view) < _HEADER.size:
+            raise SnapshotError(f"{path}: truncated snapshot header")
+        magic, format_version, _, section_count, checksum = _HEADER.unpack_from(self._view)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path}: not a medverify snapshot")
+        if format_version != FORMAT_VERSION:
+            raise SnapshotError(
+                f"{path}: snapshot format {format_version} is not supported (expected {FORMAT_VERSION})")
+        if verify and hashlib.sha256(self._view[_HEADER.size:]).digest() != checksum:
+            raise SnapshotError(f"{path}: checksum mismatch, snapshot is corrupt")
+
+        self._sections = {}
+        for i in range(section_count):
+            name, offset, length = _SECTION.unpack_from(self._view, _HEADER.size + i * _SECTION.size)
+            name = name.rstrip(b'\0').decode('ascii')
+            if offset + length > len(self._view):
+                raise SnapshotError(f"{path}: section {name} out of bounds")
+            self._sections[name] = (offset, length)
+
+        self.meta = json.loads(bytes(self._raw('meta')).decode('utf-8'))
+        self.version = self.meta['version']
+        self.checksum = self.meta['checksum']
+
+        self._string_offsets = self._array('stroff', 'Q')
+        self._string_data = self._raw('strdat')
+        self.drug_columns = self._array('drugcol', 'I')
+        self.list_offsets = self._array('lstoff', 'I')
+        self.list_values = self._array('lstval', 'I')
+        self.alias_columns = self._array('alias', 'I')
+        self.node_names = self._array('inode', 'I')
+        self.pair_columns = self._array('ipair', 'I')
+        self.adjacency_offsets = self._array('adjoff', 'I')
+        self.adjacency_nodes = self._array('adjnode', 'I')
+        self.adjacency_pairs = self._array('adjpair', 'I')
+
+    def _raw(self, name: str) -> memoryview:
+        offset, length = self._sections[name]
+        return self._view[offset:offset + length]
+
+    def _array(self, name: str, typecode: str):
+        raw = self._raw(name)
+        if sys.byteorder == 'little':
+            return raw.cast(typecode)
+        # Big-endian hosts cannot use the mapped pages directly
+        values = array(typecode, bytes(raw))
+        values.byteswap()
+        return values
+
+    def string(self, string_id: int) -> str:
+        start = self._string_offsets[string_id]
+        end = self._string_offsets[string_id + 1]
+        return str(self._string_data[start:end], 'utf-8')
+
+
+_DRUG_COLUMN_COUNT = 1 + len(DRUG_TEXT_FIELDS)
+
+
+class SnapshotDrugTable(Mapping):
+    """Read-only ``{name: record}`` mapping decoded on demand from a snapshot"""
+
+    def __init__(self, snapshot: Snapshot):
+        self._snapshot = snapshot
+        self._count = snapshot.meta['drug_count']
+        self._ids: Optional[Dict[str, int]] = None
+
+    def _name_ids(self) -> Dict[str, int]:
+        # Built on first lookup; a dict assignment is atomic, so racing builders are harmless
+        if self._ids is None:
+            columns = self._snapshot.drug_columns
+            self._ids = {self._snapshot.string(columns[i * _DRUG_COLUMN_COUNT]): i
+                         for i in range(self._count)}
+        return self._ids
+
+    def _record(self, drug_index: int):
+        snapshot = self._snapshot
+        base = drug_index * _DRUG_COLUMN_COUNT
+        record = {field: snapshot.string(snapshot.drug_columns[base + 1 + n])
+                  for n, field in enumerate(DRUG_TEXT_FIELDS)}
+        age_limits = snapshot.meta.get('age_limits')
+        if age_limits is None:
+            # Snapshots built before ages were stored
+            record.update(zip(DRUG_AGE_FIELDS, drug_age_limits(record)))
+        else:
+            name = snapshot.string(snapshot.drug_columns[base])
+            record.update(zip(DRUG_AGE_FIELDS, age_limits.get(name, (None, None))))
+        row = drug_index * len(DRUG_LIST_FIELDS)
+        for n, field in enumerate(DRUG_LIST_FIELDS):
+            start = snapshot.list_offsets[row + n]
+            end = snapshot.list_offsets[row + n + 1]
+            record[field] = tuple(snapshot.string(snapshot.list_values[k]) for k in range(start, end))
+        return MappingProxyType(record)
+
+    def __getitem__(self, name: str):
+        return self._record(self._name_ids()[name])
+
+    def __contains__(self, name) -> bool:
+        return name in self._name_ids()
+
+    def __iter__(self):
+        columns = self._snapshot.drug_columns
+        for i in range(self._count):
+            yield self._snapshot.string(columns[i * _DRUG_COLUMN_COUNT])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def items(self):
+        for i, name in enumerate(self):
+            yield name, self._record(i)
+
+    def age_limits(self) -> Optional[Dict[str, Tuple[Optional[float], Optional[float]]]]:
+        """``{name: (min_age, max_age)}`` of restricted drugs, from the metadata; None for older snapshots"""
+        age_limits = self._snapshot.meta.get('age_limits')
+        if age_limits is None:
+            return None
+        return {name: tuple(limits) for name, limits in age_limits.items()}
+
+    def values(self):
+        for i in range(self._count):
+            yield self._record(i)
+
+
+class SnapshotAliasTable(Mapping):
+    """Read-only ``{alias: canonical name}`` mapping over a snapshot"""
+
+    def __init__(self, snapshot: Snapshot):
+        self._snapshot = snapshot
+        self._aliases: Optional[Dict[str, str]] = None
+
+    def _table(self) -> Dict[str, str]:
+        if self._aliases is None:
+            columns = self._snapshot.alias_columns
+            string = self._snapshot.string
+            self._aliases = {string(columns[k]): string(columns[k + 1])
+                             for k in range(0, len(columns), 2)}
+        return self._aliases
+
+    def __getitem__(self, alias: str) -> str:
+        return self._table()[alias]
+
+    def __iter__(self):
+        return iter(self._table())
+
+    def __len__(self) -> int:
+        return self._snapshot.meta['alias_count']
+
+
+class SnapshotInteractionIndex(InteractionIndex):
+    """``InteractionIndex`` backed by the CSR arrays of a snapshot"""
+
+    def __init__(self, snapshot: Snapshot):
+        self._snapshot = snapshot
+        self._count = snapshot.meta['interaction_count']
+        self._drug_ids: Optional[Dict[str, int]] = None
+
+    @property
+    def drug_ids(self) -> Dict[str, int]:
+        if self._drug_ids is None:
+            self._drug_ids = {name: node for node, name in enumerate(self.drug_names)}
+        return self._drug_ids
+
+    @property
+    def drug_names(self) -> List[str]:
+        return [self._snapshot.string(string_id) for string_id in self._snapshot.node_names]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _row(self, drug_id: int) -> Tuple[int, int]:
+        return self._snapshot.adjacency_offsets[drug_id], self._snapshot.adjacency_offsets[drug_id + 1]
+
+    def _pair(self, pair_index: int) -> Tuple[int, int, Dict]:
+        columns = self._snapshot.pair_columns
+        base = pair_index * 4
+        info = MappingProxyType({
+            'severity': self._snapshot.string(columns[base + 2]),
+            'description': self._snapshot.string(columns[base + 3]),
+        })
+        return columns[base], columns[base + 1], info
+
+    def pair_info(self, id1: int, id2: int) -> Optional[Dict]:
+        start, end = self._row(id1)
+        nodes = self._snapshot.adjacency_nodes
+        k = bisect_left(nodes, id2, start, end)
+        if k == end or nodes[k] != id2:
+            return None
+        return self._pair(self._snapshot.adjacency_pairs[k])[2]
+
+    def _partners(self, drug_id: int, present: Dict[int, List[int]]) -> List[int]:
+        start, end = self._row(drug_id)
+        nodes = self._snapshot.adjacency_nodes
+        if end - start > len(present):
+            partners = []
+            for other in present:
+                k = bisect_left(nodes, other, start, end)
+                if k < end and nodes[k] == other:
+                    partners.append(other)
+            return partners
+        return [nodes[k] for k in range(start, end) if nodes[k] in present]
+
+    def iter_pairs(self):
+        for pair_index in range(self._count):
+            yield self._pair(pair_index)
+
+    def severity_columns(self):
+        """Pair columns straight from the mapped arrays; only distinct severity strings are decoded"""
+        import numpy as np
+
+        columns = np.asarray(self._snapshot.pair_columns, dtype=np.int64).reshape(-1, 4)
+        string_ids, string_codes = np.unique(columns[:, 2], return_inverse=True)
+        names = [self._snapshot.string(int(string_id)) for string_id in string_ids]
+        levels = sorted(set(names))
+        ranks = np.array([levels.index(name) for name in names], dtype=np.int64)
+        return columns[:, 0].copy(), columns[:, 1].copy(), ranks[string_codes], levels
+
+    def items(self):
+        """Yield ``((drug1, drug2), info)`` for every stored pair"""
+        for pair_index in range(self._count):
+            id1, id2, info = self._pair(pair_index)
+            yield (self._snapshot.string(self._snapshot.node_names[id1]),
+                   self._snapshot.string(self._snapshot.node_names[id2])), info
+
+
+class SnapshotInteractionTable(Mapping):
+    """Read-only ``{(drug1, drug2): info}`` mapping over a snapshot"""
+
+    def __init__(self, index: SnapshotInteractionIndex):
+        self._index = index
+
+    def __getitem__(self, key):
+        info = self._index.lookup(*key)
+        if info is None:
+            raise KeyError(key)
+        return info
+
+    def __iter__(self):
+        for key, _ in self._index.items():
+            yield key
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def items(self):
+        return self._index.items()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m medverify.snapshot',
+                                     description='Build or inspect drug knowledge-base snapshots')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='compile a JSON/CSV dataset into a snapshot')
+    build.add_argument('source', help='dataset JSON file, or drugs CSV file')
+    build.add_argument('output', help='snapshot file to write')
+    build.add_argument('--interactions', help='interactions CSV (drug1,drug2,severity,description)')
+
+    info = commands.add_parser('info', help='verify a snapshot and print its metadata')
+    info.add_argument('snapshot')
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        dataset = load_source(args.source, args.interactions)
+        compile_snapshot(dataset, args.output)
+        print(f"Wrote {args.output}: {len(dataset.drugs)} drugs, {len(dataset.interactions)} interactions")
+    else:
+        snapshot = Snapshot(args.snapshot)
+        meta = {key: value for key, value in snapshot.meta.items() if key != 'dosage_guidelines'}
+        print(json.dumps(meta, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
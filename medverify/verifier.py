@@ -0,0 +1,504 @@
+"""Rule-based prescription verification engine"""
+
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from .ages import AgeRules
+from .cache import LRUCache
+from .dataset import normalize_name
+from .dosing import (DrugDoseRules, WeightDosingTable, exceeds_limits, exceeds_weight_limits, parse_dose,
+                     parse_frequency)
+from .knowledge_base import KnowledgeBase, get_knowledge_base, thaw
+from .scoring import DEFAULT_WEIGHTS, SafetyScorer
+from .session import AnalysisSession
+
+# Distinct medication names whose resolution is remembered per knowledge base
+RESOLUTION_CACHE_ENTRIES = 10000
+
+# Default for ``result_cache``: the cache shared by verifiers on the same knowledge base
+_SHARED_CACHE = object()
+
+
+class Resolution(NamedTuple):
+    """Outcome of resolving one medication name against the knowledge base"""
+    drug_name: str                # canonical name (or the normalized input if unknown)
+    drug_info: Optional[Mapping]  # the shared, read-only drug record; None if not in the database
+    name_warning: Optional[str]   # fuzzy-match or not-found warning
+
+
+class MedicalPrescriptionVerifier:
+    def __init__(self, knowledge_base: Optional[KnowledgeBase] = None,
+                 result_cache: Optional[LRUCache] = _SHARED_CACHE):
+        # The knowledge base is shared and read-only; a verifier only holds references
+        self.knowledge_base = knowledge_base or get_knowledge_base()
+        self.drug_database = self.knowledge_base.drug_database
+        self.interaction_database = self.knowledge_base.interaction_database
+        self.dosage_guidelines = self.knowledge_base.dosage_guidelines
+        self.interaction_index = self.knowledge_base.interaction_index
+        # Numeric dose limits, compiled per drug on first use and shared per knowledge base
+        self.dose_rules = self.knowledge_base.derived('dose_rules', DrugDoseRules)
+        # Verifiers on the same knowledge base share its caches; pass result_cache=None to disable
+        if result_cache is _SHARED_CACHE:
+            result_cache = self.knowledge_base.derived('result_cache', lambda kb: LRUCache())
+        self.result_cache = result_cache
+        self._resolution_cache = self.knowledge_base.derived(
+            'resolution_cache', lambda kb: LRUCache(max_bytes=None, max_entries=RESOLUTION_CACHE_ENTRIES))
+        
+    # Keys of a single analysis result, and the columns of a batch result
+    RESULT_FIELDS = ('patient_info', 'medications', 'interactions', 'safety_score',
+                     'recommendations', 'home_remedies')
+    
+    # Age groups whose doses are also checked per kilogram of body weight
+    WEIGHT_BASED_GROUPS = ('pediatric', 'adolescent')
+    
+    # From this weight (kg) on, patients get adult doses and per-kg limits no longer apply
+    ADULT_WEIGHT_KG = 50
+    
+    def analyze_prescription(self, patient_data: Dict, medications: List[Dict]) -> Dict:
+        """Main analysis function"""
+        if self.result_cache is None:
+            return self._analyze(patient_data, medications, self._resolve_medication)
+        return self._analyze_cached(patient_data, medications)
+    
+    def analyze_prescriptions(self, batch) -> Dict[str, List]:
+        """Analyze many prescriptions in one call.
+        
+        ``batch`` is an iterable of ``(patient_data, medications)`` pairs or of
+        dicts with ``patient`` and ``medications`` keys, or a DataFrame with a
+        ``medications`` column plus either a ``patient`` column or
+        ``name``/``age``/``weight`` columns.
+        
+        Every distinct medication name is resolved once for the whole batch;
+        each result still gets its own copy of the drug's ``drug_info``.
+        The result is columnar: one list per field of ``analyze_prescription``,
+        with one entry per prescription in input order.
+        """
+        records = list(_iter_batch(batch))
+        
+        resolved = {}
+        for _, medications in records:
+            for med in medications:
+                if med['name'] not in resolved:
+                    resolved[med['name']] = self._resolve_medication(med['name'])
+        
+        findings = [self._collect_findings(patient_data, medications, resolved.__getitem__)
+                    for patient_data, medications in records]
+        
+        # One sparse-matrix pass scores the whole batch
+        scores = self._calculate_safety_scores(findings)
+        
+        columns = {field: [] for field in self.RESULT_FIELDS}
+        for (results, _), score, (_, medications) in zip(findings, scores, records):
+            results['safety_score'] = int(score)
+            self._complete_results(results, medications)
+            for field in self.RESULT_FIELDS:
+                columns[field].append(results[field])
+        return columns
+    
+    def start_session(self, patient_data: Dict, medications: Optional[List[Dict]] = None) -> AnalysisSession:
+        """Start an incrementally analyzed prescription for live editing"""
+        return AnalysisSession(self, patient_data, medications)
+    
+    def check_weight_doses(self, drug_names, ages, weights, dosages, frequencies):
+        """Vectorized per-kg dose check over dispensing rows.
+        
+        Takes parallel sequences (lists, arrays or DataFrame columns) and
+        returns a boolean NumPy array, True where the row is within the
+        drug's mg/kg limits. Only rows in ``WEIGHT_BASED_GROUPS`` ages and
+        under ``ADULT_WEIGHT_KG`` are checked; names are resolved once per
+        distinct name.
+        """
+        import numpy as np
+        
+        table = self.weight_dosing
+        drug_ids, doses, per_day = table.encode(self._canonical_names(drug_names), list(dosages), list(frequencies))
+        rules = self.age_rules
+        weight_based = np.isin(rules.group_codes(ages),
+                               [rules.groups.index(group) for group in self.WEIGHT_BASED_GROUPS
+                                if group in rules.groups])
+        weights = np.asarray(weights, dtype=np.float64)
+        weight_based &= weights < self.ADULT_WEIGHT_KG
+        return table.check(drug_ids, weights, doses, per_day) | ~weight_based
+    
+    def check_ages(self, drug_names, ages):
+        """Vectorized age-restriction check: a boolean NumPy array, True where the drug suits the age"""
+        import numpy as np
+        
+        drug_ids = self.age_rules.drug_ids
+        ids = np.fromiter((drug_ids.get(name, -1) for name in self._canonical_names(drug_names)),
+                          dtype=np.int64, count=len(drug_names))
+        return self.age_rules.check(ids, ages)
+    
+    def _canonical_names(self, drug_names) -> List[str]:
+        """Resolved record names for a column of names, resolving each distinct name once"""
+        names = {}
+        for name in drug_names:
+            if name not in names:
+                names[name] = self._cached_resolution(name).drug_name
+        return [names[name] for name in drug_names]
+    
+    @property
+    def safety_scorer(self) -> SafetyScorer:
+        """Sparse scoring model for this knowledge base, built once and shared"""
+        return self.knowledge_base.derived('safety_scorer', SafetyScorer)
+    
+    @property
+    def age_rules(self) -> AgeRules:
+        """Age groups and per-drug age limits, built once and shared"""
+        return self.knowledge_base.derived('age_rules', AgeRules)
+    
+    @property
+    def weight_dosing(self) -> WeightDosingTable:
+        """Per-kg dose limits as arrays for batch checks, built once and shared"""
+        return self.knowledge_base.derived('weight_dosing', WeightDosingTable)
+    
+    def _analyze(self, patient_data: Dict, medications: List[Dict], resolve) -> Dict:
+        """Analyze one prescription, resolving names with ``resolve(name) -> Resolution``"""
+        findings = self._collect_findings(patient_data, medications, resolve)
+        results = findings[0]
+        
+        # Calculate safety score
+        results['safety_score'] = DEFAULT_WEIGHTS.score(results)
+        
+        self._complete_results(results, medications)
+        return results
+    
+    def _analyze_cached(self, patient_data: Dict, medications: List[Dict]) -> Dict:
+        """Analyze one prescription through the result cache.
+        
+        The cache key is the regimen's fingerprint: its medications as sorted
+        ``(canonical name, name warning, parsed dose, doses per day)`` entries, the
+        patient's band (age group, plus weight where doses are per kg) and the
+        knowledge-base checksum. Entries hold the
+        name-independent part of the analysis in fingerprint order; the
+        caller's medication names, dosages and patient details are filled
+        back in on every lookup, so a hit returns exactly what a full
+        analysis would.
+        """
+        kb = self.knowledge_base
+        cache = self.result_cache
+        cache.bind(kb.checksum)
+        
+        resolutions = [self._cached_resolution(med['name']) for med in medications]
+        entries = [(resolution.drug_name, resolution.name_warning or '',
+                    *_dose_key(med.get('dosage', ''), med.get('frequency', '')))
+                   for med, resolution in zip(medications, resolutions)]
+        order = sorted(range(len(entries)), key=entries.__getitem__)
+        fingerprint = (kb.version, kb.checksum, self._patient_band(patient_data),
+                       tuple(entries[i] for i in order))
+        
+        cached = cache.get(fingerprint)
+        if cached is None:
+            # Entries are shared by every later hit, so they keep the read-only record
+            analyses = tuple(dict(self._analyze_medication(patient_data, medications[i], resolutions[i]),
+                                  drug_info=resolutions[i].drug_info)
+                             for i in order)
+            drug_ids = [self.interaction_index.drug_id(resolutions[i].drug_name) for i in order]
+            pairs = tuple((p, q, info['severity'], info['description'])
+                          for p, q, info in self.interaction_index.find_pairs(drug_ids))
+            score = DEFAULT_WEIGHTS.score({'interactions': [{'severity': pair[2]} for pair in pairs],
+                                           'medications': analyses})
+            cached = (analyses, pairs, score)
+            cache.put(fingerprint, cached)
+        analyses, pairs, score = cached
+        
+        results = {
+            'patient_info': patient_data,
+            'medications': [None] * len(medications),
+            'interactions': [],
+            'safety_score': score,
+            'recommendations': [],
+            'home_remedies': []
+        }
+        titles = [med['name'].title() for med in medications]
+        for position, analysis in enumerate(analyses):
+            med = medications[order[position]]
+            results['medications'][order[position]] = dict(
+                analysis, name=titles[order[position]], dosage=med.get('dosage', ''),
+                frequency=med.get('frequency', ''), drug_info=thaw(analysis['drug_info']),
+                warnings=list(analysis['warnings']), alternatives=list(analysis['alternatives']))
+        
+        for i, j, severity, description in sorted((min(order[p], order[q]), max(order[p], order[q]), severity,
+                                                   description) for p, q, severity, description in pairs):
+            results['interactions'].append({
+                'drug1': titles[i],
+                'drug2': titles[j],
+                'severity': severity,
+                'description': description
+            })
+        
+        self._complete_results(results, medications)
+        return results
+    
+    def _cached_resolution(self, name: str) -> 'Resolution':
+        """``_resolve_medication`` memoized per knowledge base"""
+        key = normalize_name(name)
+        resolution = self._resolution_cache.get(key)
+        if resolution is None:
+            resolution = self._resolve_medication(name)
+            self._resolution_cache.put(key, resolution, size=1)
+        return resolution
+    
+    def _collect_findings(self, patient_data: Dict, medications: List[Dict], resolve) -> Tuple[Dict, List[str]]:
+        """Per-medication analyses and interactions, plus the regimen's canonical drug names"""
+        resolved = [resolve(med['name']) for med in medications]
+        results = {
+            'patient_info': patient_data,
+            'medications': [],
+            'interactions': [],
+            'safety_score': 0,
+            'recommendations': [],
+            'home_remedies': []
+        }
+        
+        # Analyze each medication
+        for med, resolution in zip(medications, resolved):
+            med_analysis = self._analyze_medication(patient_data, med, resolution)
+            results['medications'].append(med_analysis)
+        
+        # Check interactions
+        results['interactions'] = self._check_interactions(medications, resolved)
+        
+        return results, [resolution.drug_name for resolution in resolved]
+    
+    def _complete_results(self, results: Dict, medications: List[Dict]) -> None:
+        """Add the recommendations that depend on the safety score"""
+        # Generate recommendations
+        results['recommendations'] = self._generate_recommendations(results)
+        
+        # Add home remedies
+        results['home_remedies'] = self._generate_home_remedies(medications)
+    
+    def _analyze_medication(self, patient_data: Dict, medication: Dict,
+                            resolution: Optional['Resolution'] = None) -> Dict:
+        """Analyze individual medication"""
+        drug_name, drug_info, name_warning = resolution or self._resolve_medication(medication['name'])
+        dosage = medication.get('dosage', '')
+        frequency = medication.get('frequency', '')
+        
+        if drug_info is not None:
+            age_group = self._get_age_group(patient_data['age'])
+            # Results are handed to callers, so they get a copy, never the shared record itself
+            drug_info = thaw(drug_info)
+            
+            analysis = {
+                'name': medication['name'].title(),
+                'dosage': dosage,
+                'frequency': frequency,
+                'drug_info': drug_info,
+                'age_appropriate': self._check_age_appropriateness(drug_name, patient_data['age']),
+                'dosage_appropriate': self._check_dosage_appropriateness(drug_name, dosage, frequency, patient_data),
+                'alternatives': drug_info.get('alternatives', []),
+                'warnings': [],
+                'found_in_database': True
+            }
+            
+            # Check contraindications
+            if 'contraindications' in drug_info:
+                analysis['warnings'].extend(drug_info['contraindications'])
+            
+            if name_warning:
+                analysis['warnings'].append(name_warning)
+            
+            return analysis
+        else:
+            return {
+                'name': medication['name'].title(),
+                'dosage': dosage,
+                'frequency': frequency,
+                'drug_info': None,
+                'age_appropriate': True,
+                'dosage_appropriate': True,
+                'alternatives': ['Consult healthcare provider for alternatives'],
+                'warnings': [name_warning],
+                'found_in_database': False
+            }
+    
+    def _resolve_medication(self, name: str) -> 'Resolution':
+        """Resolve a medication name to its record and any name-matching warning"""
+        drug_name, fuzzy_match = self._resolve_name(name)
+        
+        if drug_name in self.drug_database:
+            drug_info = self.drug_database[drug_name]
+            name_warning = None
+            if fuzzy_match is not None:
+                name_warning = (f"name matched to {fuzzy_match.target.title()} "
+                                f"({fuzzy_match.confidence:.0%} confidence) - confirm the drug name")
+            return Resolution(drug_name, drug_info, name_warning)
+        
+        name_warning = 'Drug not found in database - manual verification required'
+        suggestions = [m.target.title() for m in self.knowledge_base.fuzzy_matcher().match(drug_name, limit=3)
+                       if m.target in self.drug_database]
+        if suggestions:
+            name_warning += f" (did you mean: {', '.join(suggestions)}?)"
+        return Resolution(drug_name, None, name_warning)
+    
+    def _resolve_name(self, name: str):
+        """Resolve a medication name to its canonical name.
+        
+        Exact names and aliases resolve directly; anything else falls back to
+        fuzzy matching and returns the confident match alongside the name.
+        """
+        canonical = self.knowledge_base.canonical_name(name)
+        if canonical in self.drug_database or self.interaction_index.drug_id(canonical) is not None:
+            return canonical, None
+        fuzzy_match = self.knowledge_base.fuzzy_matcher().best(canonical)
+        if fuzzy_match is not None:
+            return fuzzy_match.target, fuzzy_match
+        return canonical, None
+    
+    def _get_age_group(self, age: int) -> str:
+        """Determine age group"""
+        return self.age_rules.group(age)
+    
+    def _patient_band(self, patient_data: Dict) -> Tuple:
+        """Everything about a patient that the per-medication checks depend on"""
+        age = patient_data['age']
+        return self._get_age_group(age), self.age_rules.band(age), self._dosing_weight(patient_data)
+    
+    def _dosing_weight(self, patient_data: Dict) -> Optional[float]:
+        """Weight to check per-kg limits against; None for adults and patients of adult weight"""
+        weight = patient_data.get('weight')
+        if weight is None or weight >= self.ADULT_WEIGHT_KG:
+            return None
+        if self._get_age_group(patient_data['age']) not in self.WEIGHT_BASED_GROUPS:
+            return None
+        return weight
+    
+    def _check_age_appropriateness(self, drug_name: str, age: int) -> bool:
+        """Check if drug is appropriate for age"""
+        return self.age_rules.allows(drug_name, age)
+    
+    def _check_dosage_appropriateness(self, drug_name: str, dosage: str, frequency: str, patient_data: Dict) -> bool:
+        """Check the dose and daily total against the drug's compiled limits, per kg for children.
+        
+        The adult limit applies to everyone, so a per-kg limit never allows more than an adult dose.
+        """
+        dose, per_day = parse_dose(dosage), parse_frequency(frequency)
+        rules = self.dose_rules.get(drug_name)
+        if rules is None:
+            return True
+        limits, weight_limits = rules
+        if exceeds_limits(limits, dose, per_day) is not None:
+            return False
+        weight = self._dosing_weight(patient_data)
+        if weight_limits is not None and weight is not None:
+            return exceeds_weight_limits(weight_limits, weight, dose, per_day) is None
+        return True
+    
+    def _check_interactions(self, medications: List[Dict], resolved: Optional[List['Resolution']] = None) -> List[Dict]:
+        """Check for drug interactions"""
+        if resolved is None:
+            resolved = [self._resolve_name(med['name']) for med in medications]
+        index = self.interaction_index
+        drug_ids = [index.drug_id(resolution[0]) for resolution in resolved]
+        
+        interactions = []
+        for i, j, interaction_info in index.find_pairs(drug_ids):
+            interactions.append({
+                'drug1': medications[i]['name'].title(),
+                'drug2': medications[j]['name'].title(),
+                'severity': interaction_info['severity'],
+                'description': interaction_info['description']
+            })
+        
+        return interactions
+    
+    def _calculate_safety_scores(self, findings: List[Tuple[Dict, List[str]]]):
+        """Calculate overall safety scores (0-100) for ``_collect_findings`` outputs"""
+        scorer = self.safety_scorer
+        weights = scorer.weights
+        regimens, _ = scorer.encode(drug_names for _, drug_names in findings)
+        medication_penalties = [sum(weights.medication_penalty(med) for med in results['medications'])
+                                for results, _ in findings]
+        return scorer.score(regimens, medication_penalties)
+    
+    def _generate_recommendations(self, results: Dict) -> List[str]:
+        """Generate safety recommendations"""
+        recommendations = []
+        
+        if results['safety_score'] < 70:
+            recommendations.append("⚠️ URGENT: Consult with healthcare provider before taking these medications")
+        
+        for interaction in results['interactions']:
+            if interaction['severity'] == 'high':
+                recommendations.append(f"🚨 HIGH RISK: Avoid combining {interaction['drug1']} with {interaction['drug2']}")
+            elif interaction['severity'] == 'moderate':
+                recommendations.append(f"⚠️ MODERATE RISK: Monitor closely when taking {interaction['drug1']} with {interaction['drug2']}")
+        
+        for med in results['medications']:
+            if not med['age_appropriate']:
+                recommendations.append(f"❌ AGE CONCERN: {med['name']} may not be appropriate for this age group")
+            if not med['dosage_appropriate']:
+                recommendations.append(f"💊 DOSAGE: {med['name']} {med['dosage']} {med['frequency']} exceeds the recommended dose")
+            if med['warnings']:
+                recommendations.append(f"⚠️ {med['name']}: Check for {', '.join(med['warnings'])}")
+            if not med['found_in_database']:
+                recommendations.append(f"🔍 {med['name']}: Not in database - requires manual verification")
+        
+        if not recommendations:
+            recommendations.append("✅ No major safety concerns identified")
+        
+        # Add general recommendations
+        recommendations.append("📋 Always take medications as prescribed by your healthcare provider")
+        recommendations.append("🕒 Maintain consistent timing for medication doses")
+        recommendations.append("💧 Stay hydrated while taking medications")
+        
+        return recommendations
+    
+    def _generate_home_remedies(self, medications: List[Dict]) -> List[Dict]:
+        """Generate home remedy suggestions"""
+        remedies = [
+            {
+                'category': 'Hydration',
+                'recommendation': 'Drink 8-10 glasses of water daily',
+                'benefit': 'Helps medication absorption and reduces side effects'
+            },
+            {
+                'category': 'Nutrition',
+                'recommendation': 'Take medications with food if recommended',
+                'benefit': 'Reduces stomach irritation and improves absorption'
+            },
+            {
+                'category': 'Sleep',
+                'recommendation': 'Maintain 7-8 hours of quality sleep',
+                'benefit': 'Supports immune system and medication effectiveness'
+            },
+            {
+                'category': 'Exercise',
+                'recommendation': 'Light to moderate exercise as tolerated',
+                'benefit': 'Improves circulation and overall health'
+            },
+            {
+                'category': 'Monitoring',
+                'recommendation': 'Keep a medication diary',
+                'benefit': 'Track effectiveness and side effects'
+            },
+            {
+                'category': 'Safety',
+                'recommendation': 'Store medications properly',
+                'benefit': 'Maintains medication potency and prevents accidents'
+            }
+        ]
+        
+        return remedies
+
+
+def _dose_key(dosage, frequency) -> Tuple:
+    """Parsed dose and doses per day, as sortable cache-key parts"""
+    return tuple(parse_dose(dosage) or ()), parse_frequency(frequency) or 0.0
+
+
+def _iter_batch(batch) -> Iterable[Tuple[Dict, List[Dict]]]:
+    """Normalize the accepted batch shapes to ``(patient_data, medications)`` pairs"""
+    if hasattr(batch, 'to_dict') and hasattr(batch, 'columns'):
+        batch = batch.to_dict('records')
+    for record in batch:
+        if isinstance(record, dict):
+            medications = record['medications']
+            if 'patient' in record:
+                patient_data = record['patient']
+            else:
+                patient_data = {key: value for key, value in record.items() if key != 'medications'}
+        else:
+            patient_data, medications = record
+        yield patient_data, list(medications)
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from medverify.extraction import iter_medications, main
+
+NOTES = ' '.join(f'Patient {i}: paracetamol 500mg every 6 hours, then ibuprofen 200 mg tid.' for i in range(40))
+
+
+def _spans(lines):
+    return [tuple(json.loads(line)['span']) for line in lines]
+
+
+@pytest.mark.parametrize('chunk_size', [384, 1000, 4096])
+def test_cli_small_chunk_size_matches_whole_text(tmp_path, capsys, chunk_size):
+    path = tmp_path / 'notes.txt'
+    path.write_text(NOTES, encoding='utf-8')
+
+    assert main([str(path), '--chunk-size', str(chunk_size)]) == 0
+
+    expected = [medication['span'] for medication in iter_medications(NOTES)]
+    assert _spans(capsys.readouterr().out.splitlines()) == expected
+
+
+def test_cli_rejects_chunk_size_below_longest_mention(tmp_path, capsys):
+    path = tmp_path / 'notes.txt'
+    path.write_text(NOTES, encoding='utf-8')
+
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(path), '--chunk-size', '100'])
+
+    assert exit_info.value.code == 2
+    assert '--chunk-size must be at least' in capsys.readouterr().err
@@ -0,0 +1,31 @@
+import random
+
+from medverify.fuzzy import FuzzyMatcher, _bit_parallel_levenshtein, _char_masks
+
+
+def _levenshtein(a, b):
+    """Reference edit distance, by the full dynamic-programming table"""
+    previous = list(range(len(a) + 1))
+    for i, char_b in enumerate(b, 1):
+        current = [i]
+        for j, char_a in enumerate(a, 1):
+            current.append(min(previous[j - 1] + (char_a != char_b), previous[j] + 1, current[j - 1] + 1))
+        previous = current
+    return previous[-1]
+
+
+def test_bit_parallel_distance_matches_reference():
+    rng = random.Random(0)
+    for _ in range(5000):
+        a = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 12)))
+        b = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 12)))
+        assert _bit_parallel_levenshtein(_char_masks(a), len(a), b) == _levenshtein(a, b), (a, b)
+
+
+def test_match_finds_misspelled_names():
+    matcher = FuzzyMatcher([('paracetamol', 'paracetamol'), ('tylenol', 'paracetamol'),
+                            ('ibuprofen', 'ibuprofen'), ('amoxicillin', 'amoxicillin')])
+    assert matcher.best('paracetmol').target == 'paracetamol'
+    assert matcher.best('amoxicilin').name == 'amoxicillin'
+    assert matcher.match('ibuprofen')[0].distance == 0
+    assert matcher.match('warfarin') == []
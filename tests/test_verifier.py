@@ -0,0 +1,31 @@
+import pytest
+
+from medverify import MedicalPrescriptionVerifier
+
+
+@pytest.fixture(scope='module')
+def verifier():
+    return MedicalPrescriptionVerifier(result_cache=None)
+
+
+def _dosage_appropriate(verifier, patient, name, dosage, frequency):
+    result = verifier.analyze_prescription(patient, [{'name': name, 'dosage': dosage, 'frequency': frequency}])
+    return result['medications'][0]['dosage_appropriate']
+
+
+def test_adolescent_of_adult_weight_gets_adult_dose_limits(verifier):
+    patient = {'name': 'Teen', 'age': 16, 'weight': 60}
+    assert _dosage_appropriate(verifier, patient, 'Paracetamol', '1g', 'every 6 hours')
+    # The adult daily maximum still applies
+    assert not _dosage_appropriate(verifier, patient, 'Paracetamol', '1g', 'every 4 hours')
+
+
+def test_light_adolescent_is_checked_per_kg(verifier):
+    patient = {'name': 'Teen', 'age': 16, 'weight': 40}
+    assert not _dosage_appropriate(verifier, patient, 'Paracetamol', '1g', 'every 6 hours')
+    assert _dosage_appropriate(verifier, patient, 'Paracetamol', '500mg', 'every 6 hours')
+
+
+def test_vectorized_weight_check_matches_single_analysis(verifier):
+    ok = verifier.check_weight_doses(['Paracetamol'] * 2, [16, 16], [60, 40], ['1g'] * 2, ['every 6 hours'] * 2)
+    assert ok.tolist() == [True, False]